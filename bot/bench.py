@@ -0,0 +1,202 @@
+"""
+Benchmark harness for the storage layer and cog commands.
+
+Drives the store methods and the `gamedump`, `gameshow`, `randomgame`,
+`stats`, `now` and `flip` commands through a stub context (no network) at
+the given data sizes and concurrency levels, and prints a JSON report with
+ops/sec and p50/p99 latency per scenario.
+
+Usage (from the repo root):
+
+    python bot/bench.py --backend json sqlite --games 10 10000 --users 100 --concurrency 1 16
+    python bot/bench.py --games 1000000 --users 100000 --ops 2000 --out bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from cogs.fun import Fun  # noqa: E402
+from cogs.games import Games  # noqa: E402
+from cogs.meta import Meta  # noqa: E402
+from cogs.time import TimeCog  # noqa: E402
+from stats import StatsAggregator  # noqa: E402
+from storage import create_store  # noqa: E402
+
+
+class StubMessage:
+    _next_id = 1
+
+    def __init__(self, channel: "StubChannel", **kwargs: Any):
+        self.id = StubMessage._next_id
+        StubMessage._next_id += 1
+        self.channel = channel
+        self.kwargs = kwargs
+
+    async def edit(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
+
+
+class StubChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.name = f"bench-{channel_id}"
+
+
+class StubContext:
+    """Just enough of `commands.Context` for the cog callbacks; `send` never leaves the process."""
+
+    def __init__(self, user_id: int, channel: StubChannel):
+        self.author = SimpleNamespace(id=user_id, name=f"user{user_id}")
+        self.channel = channel
+        self.guild = None
+        self.message = SimpleNamespace(content="")
+        self.sent = 0
+
+    async def send(self, *args: Any, **kwargs: Any) -> StubMessage:
+        self.sent += 1
+        return StubMessage(self.channel, **kwargs)
+
+
+def _summarize(name: str, latencies: List[float], wall: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "scenario": name,
+        "ops": len(ordered),
+        "ops_per_sec": len(ordered) / wall if wall else 0.0,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+async def _drive(name: str, op: Callable[[int], Awaitable[Any]], ops: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    counter = iter(range(ops))
+
+    async def worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summarize(name, latencies, time.perf_counter() - started)
+
+
+def _seed_json(path: Path, games: int, users: int) -> None:
+    rng = random.Random(42)
+    now = int(time.time())
+    data = {
+        "games": [
+            {"user_id": i % users, "game_name": f"Game {i}", "rating": rng.randint(0, 10), "created_at": now}
+            for i in range(games)
+        ],
+        "command_stats": {str(u): {"flip": rng.randint(1, 50), "gameshow": rng.randint(1, 50)} for u in range(users)},
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+async def run_case(backend: str, games: int, users: int, concurrency: int, ops: int) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix="oficys-bench-") as tmp:
+        data_dir = Path(tmp)
+        _seed_json(data_dir / "store.json", games, users)
+        store = create_store(backend, data_dir, flush_interval=3600, flush_threshold=10**9)
+        load_started = time.perf_counter()
+        await store.start()
+        load_seconds = time.perf_counter() - load_started
+
+        stats = StatsAggregator(store, flush_interval=3600)
+        bot = SimpleNamespace(store=store, stats=stats, countdowns=None)
+        games_cog, meta_cog, time_cog, fun_cog = Games(bot), Meta(bot), TimeCog(bot), Fun(bot)
+        channel = StubChannel(1)
+        rng = random.Random(7)
+
+        def user() -> int:
+            return rng.randrange(users)
+
+        def ctx() -> StubContext:
+            return StubContext(user(), channel)
+
+        scenarios: Dict[str, Callable[[int], Awaitable[Any]]] = {
+            "store.add_or_update_game": lambda i: store.add_or_update_game(user(), f"Bench {i % 500}", i % 11),
+            "store.list_games": lambda i: store.list_games(user()),
+            "store.list_games>7": lambda i: store.list_games(user(), ">", 7),
+            "store.random_game": lambda i: store.random_game(user()),
+            "store.random_game>7:weighted": lambda i: store.random_game(user(), ">", 7, mode="weighted"),
+            "store.random_game:bag": lambda i: store.random_game(user(), mode="bag"),
+            "store.add_or_update_games:100": lambda i: store.add_or_update_games(
+                user(), [(f"Import {i}-{j}", j % 11) for j in range(100)]
+            ),
+            "store.find_games": lambda i: store.find_games(user(), f"game {i % 97}"),
+            "store.find_games:typo": lambda i: store.find_games(user(), f"gmae {i % 97}"),
+            "store.game_info": lambda i: store.game_info(f"Game {i % 97}"),
+            "store.top_games": lambda i: store.top_games(10),
+            "store.merge_stats": lambda i: store.merge_stats({user(): {"flip": 1}}),
+            "store.get_stats": lambda i: store.get_stats(user()),
+            "cmd.gamedump": lambda i: games_cog.gamedump.callback(games_cog, ctx(), body=f"Bench {i % 500} {i % 11}"),
+            "cmd.gameshow": lambda i: games_cog.gameshow.callback(games_cog, ctx(), None),
+            "cmd.randomgame": lambda i: games_cog.randomgame.callback(games_cog, ctx(), options=">5"),
+            "cmd.gamefind": lambda i: games_cog.gamefind.callback(games_cog, ctx(), query=f"gme {i % 97}"),
+            "cmd.gameinfo": lambda i: games_cog.gameinfo.callback(games_cog, ctx(), game_name=f"game {i % 97}"),
+            "cmd.stats": lambda i: meta_cog.stats.callback(meta_cog, ctx()),
+            "cmd.now": lambda i: time_cog.now.callback(time_cog, ctx()),
+            "cmd.flip": lambda i: fun_cog.flip.callback(fun_cog, ctx(), options="a b c"),
+        }
+        results = []
+        for name, op in scenarios.items():
+            row = await _drive(name, op, ops, concurrency)
+            row.update(backend=backend, games=games, users=users, concurrency=concurrency)
+            results.append(row)
+        results.append(
+            {"scenario": "store.start", "backend": backend, "games": games, "users": users, "load_seconds": load_seconds}
+        )
+        await stats.close()
+        await store.close()
+        return results
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Oficys storage and commands.")
+    parser.add_argument("--backend", nargs="+", default=["json"], choices=["json", "sqlite"])
+    parser.add_argument("--games", nargs="+", type=int, default=[10, 10_000])
+    parser.add_argument("--users", nargs="+", type=int, default=[10])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 16])
+    parser.add_argument("--ops", type=int, default=1000, help="operations per scenario")
+    parser.add_argument("--out", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report: List[Dict[str, Any]] = []
+    for backend in args.backend:
+        for games in args.games:
+            for users in args.users:
+                for concurrency in args.concurrency:
+                    print(f"[bench] {backend} games={games} users={users} concurrency={concurrency}", file=sys.stderr)
+                    report.extend(await run_case(backend, games, users, concurrency, args.ops))
+
+    text = json.dumps({"python": sys.version.split()[0], "results": report}, indent=2)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,49 @@
-    import asyncio
+import asyncio
+import hashlib
+import json
 import logging
+import signal
+import time
 from pathlib import Path
+from typing import Any
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 
-from config import COMMAND_PREFIX, get_app_id, get_bot_token
-from storage.json_store import JsonStore
+from config import (
+    CLUSTER_WORKER,
+    COMMAND_MODE,
+    COMMAND_PREFIX,
+    COUNTDOWN_CHANNEL_SPACING,
+    COUNTDOWN_INTERVAL,
+    COUNTDOWN_MAX_EDITS_PER_SECOND,
+    LEAN_MODE,
+    LOOP_LAG_WARN_MS,
+    METRICS_HOST,
+    METRICS_PORT,
+    RATE_LIMITS,
+    SHARDED,
+    STARTUP_MODE,
+    STATS_FLUSH_INTERVAL,
+    STORAGE_BACKEND,
+    STORE_FLUSH_INTERVAL,
+    STORE_FLUSH_THRESHOLD,
+    get_app_id,
+    get_bot_token,
+    get_shard_config,
+)
+from countdown import CountdownScheduler
+from loop_monitor import LoopLagMonitor
+from metrics import MetricsServer, TimedStore, registry
+from outbox import Outbox
+from ratelimit import RateLimited, RateLimiter
+from shard_metrics import ShardMetrics
+from startup import timeline
+from stats import StatsAggregator
+from storage import LazyStore, create_store
 from ui import error as error_embed
+from ui import template
 from ui import warn as warn_embed
 
 
@@ -22,37 +58,260 @@ COGS = [
 logger = logging.getLogger("oficys.bot")
 
 
+_SEND = registry.histogram("oficys_send_seconds")
+
+
+class OficysContext(commands.Context):
+    # perf_counter() when the command was invoked; set in `OficysBot.on_command`.
+    invoked_at: float = 0.0
+
+    async def send(self, *args: Any, **kwargs: Any) -> discord.Message:
+        send = super().send
+        started = time.perf_counter()
+        try:
+            return await self.bot.outbox.send(self.channel.id, lambda: send(*args, **kwargs))
+        finally:
+            _SEND.observe(time.perf_counter() - started)
+
+
+def _usage(ctx: commands.Context) -> str:
+    if not ctx.command:
+        return "`comando`"
+    return f"`{COMMAND_PREFIX}{ctx.command.qualified_name} {ctx.command.signature}`"
+
+
+class OficysTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Slash invocations skip `OficysBot.invoke`, so apply the same limits here.
+        command = interaction.command
+        bot: "OficysBot" = self.client  # type: ignore[assignment]
+        if command is None or interaction.type is discord.InteractionType.autocomplete:
+            # Autocomplete fires per keystroke and can't be answered with a message.
+            return True
+        limited = bot.rate_limited(
+            command.qualified_name, interaction.user.id, interaction.channel_id or 0, interaction.guild_id
+        )
+        if limited is None:
+            return True
+        await interaction.response.send_message(f"Calma aí 😅 Tente de novo em **{limited.retry_after:.1f}s**.", ephemeral=True)
+        return False
+
+
 class OficysBot(commands.Bot):
     def __init__(self, **kwargs):
-        intents = discord.Intents.default()
-        intents.message_content = True
+        if LEAN_MODE:
+            # The cogs only need guilds, message authors/channels and DMs.
+            intents = discord.Intents.none()
+            intents.guilds = True
+            intents.guild_messages = True
+            intents.dm_messages = True
+            kwargs.setdefault("max_messages", None)
+            kwargs.setdefault("member_cache_flags", discord.MemberCacheFlags.none())
+            kwargs.setdefault("chunk_guilds_at_startup", False)
+        else:
+            intents = discord.Intents.default()
+        if COMMAND_MODE == "slash":
+            intents.guild_messages = False
+        else:
+            intents.message_content = True
+        app_id = get_app_id()
         super().__init__(
             command_prefix=COMMAND_PREFIX,
             intents=intents,
             help_command=None,
+            tree_cls=OficysTree,
+            application_id=int(app_id) if app_id else None,
             **kwargs,
         )
-        self.store = JsonStore(BASE_DIR / "data" / "store.json")
-        self.app_id = get_app_id()
+        store = create_store(
+            STORAGE_BACKEND,
+            BASE_DIR / "data",
+            flush_interval=STORE_FLUSH_INTERVAL,
+            flush_threshold=STORE_FLUSH_THRESHOLD,
+        )
+        if hasattr(store, "on_lock_wait"):
+            store.on_lock_wait = registry.histogram("oficys_store_lock_wait_seconds").observe
+        self.fast_startup = STARTUP_MODE == "fast"
+        # Set when the store can't be loaded; `run_bot` re-raises it after shutting down.
+        self.startup_error: BaseException | None = None
+        self.store = TimedStore(LazyStore(store, on_error=self._store_failed) if self.fast_startup else store)
+        self.stats = StatsAggregator(self.store, flush_interval=STATS_FLUSH_INTERVAL)
+        self.outbox = Outbox()
+        self.countdowns = CountdownScheduler(
+            self,
+            # Each cluster worker owns different channels, so each keeps its own file.
+            BASE_DIR / "data" / (f"countdowns-{CLUSTER_WORKER}.json" if CLUSTER_WORKER else "countdowns.json"),
+            interval=COUNTDOWN_INTERVAL,
+            channel_spacing=COUNTDOWN_CHANNEL_SPACING,
+            max_edits_per_second=COUNTDOWN_MAX_EDITS_PER_SECOND,
+        )
+        self.rate_limiter = RateLimiter(RATE_LIMITS)
+        self.app_id = app_id
+        self.loop_monitor = LoopLagMonitor(warn_ms=LOOP_LAG_WARN_MS)
+        self.shard_metrics = ShardMetrics()
+        self.metrics = registry
+        self.metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+        self._sync_task: asyncio.Task[None] | None = None
+        self._shutdown_task: asyncio.Task[None] | None = None
 
     async def setup_hook(self) -> None:
+        with timeline.phase("setup:metrics"):
+            self.loop_monitor.start()
+            if self.metrics_server is not None:
+                await self.metrics_server.start()
+        # In fast mode this only schedules the load; the first store call waits for it.
+        with timeline.phase("setup:store"):
+            await self.store.start()
+        self.stats.start()
+        with timeline.phase("setup:countdowns"):
+            await self.countdowns.start()
+
         logger.info("Loading extensions: %s", ", ".join(COGS))
-        for ext in COGS:
-            try:
-                await self.load_extension(ext)
-                logger.info("Loaded extension: %s", ext)
-            except Exception:
-                logger.exception("Failed to load extension: %s", ext)
+        with timeline.phase("setup:extensions"):
+            if self.fast_startup:
+                await asyncio.gather(*(self._load_extension(ext) for ext in COGS))
+            else:
+                for ext in COGS:
+                    await self._load_extension(ext)
+
+        logger.info("Prefix: %s (command mode: %s)", COMMAND_PREFIX, COMMAND_MODE)
+        if self.fast_startup:
+            self._sync_task = asyncio.create_task(self.sync_app_commands(), name="sync-app-commands")
+        else:
+            await self.sync_app_commands()
+        logger.info("Startup (%s): %s", STARTUP_MODE, timeline.summary())
+
+    def _store_failed(self, exc: BaseException) -> None:
+        # Fast startup loads the store after login has begun; without its data
+        # (e.g. a corrupt store.json) the bot must not keep running.
+        if self.startup_error is not None:
+            return
+        self.startup_error = exc
+        logger.critical("Store failed to load; shutting down")
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Start `close()` from a callback or signal handler, keeping the task for `wait_closed`."""
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.ensure_future(self.close())
 
-        logger.info("Prefix: %s", COMMAND_PREFIX)
+    async def wait_closed(self) -> None:
+        # `async with bot` only waits for discord.py's part of `close()`; the
+        # stats/store flush that follows it runs in the shutdown task.
+        if self._shutdown_task is not None:
+            await self._shutdown_task
+
+    async def sync_app_commands(self) -> None:
+        """
+        Bulk-overwrite the global slash commands, but only when their
+        definitions (or the application) changed since the last sync.
+        """
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands()]
+        digest = hashlib.sha256(json.dumps([self.application_id, payload], sort_keys=True).encode()).hexdigest()
+        path = BASE_DIR / "data" / "app_commands.sha256"
+        try:
+            if path.exists() and path.read_text(encoding="utf-8").strip() == digest:
+                logger.info("Slash commands unchanged; skipping sync")
+                return
+            synced = await self.tree.sync()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(digest, encoding="utf-8")
+            logger.info("Synced %s slash command(s)", len(synced))
+        except Exception:
+            logger.exception("Failed to sync slash commands")
+
+    async def _load_extension(self, ext: str) -> None:
+        started = time.perf_counter()
+        try:
+            await self.load_extension(ext)
+        except Exception:
+            logger.exception("Failed to load extension: %s", ext)
+            return
+        elapsed = time.perf_counter() - started
+        timeline.record(f"ext:{ext.removeprefix('cogs.')}", elapsed)
+        logger.info("Loaded extension: %s (%.0fms)", ext, elapsed * 1000)
+
+    async def close(self) -> None:
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+        await self.countdowns.close()
+        await self.outbox.close()
+        await super().close()
+        # Persist whatever the aggregator and write-behind store still hold in
+        # memory; a store that never loaded has nothing to write back into.
+        if self.startup_error is None:
+            await self.stats.close()
+        await self.store.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        self.loop_monitor.stop()
 
     async def on_ready(self) -> None:
         user = self.user
         if user:
             logger.info("Logged in as %s (id=%s)", user, user.id)
         logger.info("Connected guilds: %s", len(self.guilds))
+        if timeline.mark_ready():
+            logger.info("Ready %.2fs after process start: %s", timeline.ready_after, timeline.summary())
+
+    def shard_latencies(self) -> list[tuple[int, float]]:
+        return [(self.shard_id or 0, self.latency)]
+
+    async def on_shard_connect(self, shard_id: int) -> None:
+        self.shard_metrics.lifecycle(shard_id, "connects")
+
+    async def on_shard_disconnect(self, shard_id: int) -> None:
+        self.shard_metrics.lifecycle(shard_id, "disconnects")
+
+    async def on_shard_resumed(self, shard_id: int) -> None:
+        self.shard_metrics.lifecycle(shard_id, "resumes")
+
+    async def on_shard_ready(self, shard_id: int) -> None:
+        logger.info("Shard %s ready", shard_id)
+
+    async def on_message(self, message: discord.Message) -> None:
+        shard_id = message.guild.shard_id if message.guild else 0
+        self.shard_metrics.record(shard_id, "messages")
+        # Most traffic is plain chat: drop it before building a context.
+        if message.author.bot or not message.content.startswith(COMMAND_PREFIX):
+            return
+        await self.process_commands(message)
+
+    def rate_limited(self, command: str, user_id: int, channel_id: int, guild_id: int | None) -> RateLimited | None:
+        limited = self.rate_limiter.hit(command, user_id, channel_id, guild_id)
+        if limited is not None:
+            self.metrics.inc("oficys_rate_limited_total", command=command, scope=limited.scope)
+        return limited
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        # Throttled commands are turned away here, before `on_command`, checks,
+        # storage or any send; only the first rejection per bucket gets a reply.
+        if ctx.command is not None:
+            limited = self.rate_limited(
+                ctx.command.qualified_name, ctx.author.id, ctx.channel.id, ctx.guild.id if ctx.guild else None
+            )
+            if limited is not None:
+                self.dispatch("command_error", ctx, limited)
+                return
+        await super().invoke(ctx)
+
+    async def get_context(self, origin: Any, /, *, cls: Any = OficysContext) -> Any:
+        with self.metrics.timer("oficys_parse_seconds"):
+            return await super().get_context(origin, cls=cls)
+
+    def _observe_command(self, ctx: commands.Context, status: str) -> None:
+        invoked_at = getattr(ctx, "invoked_at", 0.0)
+        if ctx.command and invoked_at:
+            name = ctx.command.qualified_name
+            self.metrics.observe("oficys_command_seconds", time.perf_counter() - invoked_at, command=name, status=status)
 
     async def on_command(self, ctx: commands.Context) -> None:
+        ctx.invoked_at = time.perf_counter()
+        if ctx.command:
+            self.metrics.inc("oficys_commands_total", command=ctx.command.qualified_name)
+            self.stats.record(ctx.author.id, ctx.command.qualified_name, ctx.guild.id if ctx.guild else None)
+            self.shard_metrics.record(ctx.guild.shard_id if ctx.guild else 0, "commands")
         channel = getattr(ctx.channel, "name", "DM")
         guild = getattr(ctx.guild, "name", "DM")
         logger.info(
@@ -64,34 +323,51 @@ class OficysBot(commands.Bot):
             channel,
         )
 
+    async def on_command_completion(self, ctx: commands.Context) -> None:
+        self._observe_command(ctx, "ok")
+
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError) -> None:
         if isinstance(error, commands.CommandNotFound):
             return
+        self._observe_command(ctx, "error")
+        name = ctx.command.qualified_name if ctx.command else ""
         if isinstance(error, commands.MissingRequiredArgument):
-            usage = f"`{COMMAND_PREFIX}{ctx.command.qualified_name} {ctx.command.signature}`" if ctx.command else "`comando`"
             await ctx.send(
-                embed=warn_embed(
-                    "Faltou algum argumento",
-                    f"Uso correto:\n{usage}\n\nDica: `&help` mostra exemplos.",
+                embed=template(
+                    f"missing-arg:{name}",
+                    lambda: warn_embed(
+                        "Faltou algum argumento",
+                        f"Uso correto:\n{_usage(ctx)}\n\nDica: `&help` mostra exemplos.",
+                    ),
                 )
             )
             return
         if isinstance(error, commands.BadArgument):
-            usage = f"`{COMMAND_PREFIX}{ctx.command.qualified_name} {ctx.command.signature}`" if ctx.command else "`comando`"
-            await ctx.send(embed=warn_embed("Argumento inválido", f"Tente assim:\n{usage}"))
+            await ctx.send(
+                embed=template(f"bad-arg:{name}", lambda: warn_embed("Argumento inválido", f"Tente assim:\n{_usage(ctx)}"))
+            )
+            return
+        if isinstance(error, RateLimited) and not error.notify:
             return
         if isinstance(error, commands.CommandOnCooldown):
-            await ctx.send(embed=warn_embed("Calma aí 😅", f"Tente de novo em **{error.retry_after:.1f}s**."))
+            e = template("cooldown", lambda: warn_embed("Calma aí 😅", None)).copy()
+            e.description = f"Tente de novo em **{error.retry_after:.1f}s**."
+            await ctx.send(embed=e)
             return
         if isinstance(error, commands.CheckFailure):
-            await ctx.send(embed=error_embed("Sem permissão", "Você não pode usar esse comando aqui."))
+            await ctx.send(
+                embed=template("no-permission", lambda: error_embed("Sem permissão", "Você não pode usar esse comando aqui."))
+            )
             return
 
         # Generic fallback for unexpected errors.
         await ctx.send(
-            embed=error_embed(
-                "Ops, algo deu errado",
-                "O erro foi registrado no terminal.\nTente novamente em alguns segundos.",
+            embed=template(
+                "unexpected-error",
+                lambda: error_embed(
+                    "Ops, algo deu errado",
+                    "O erro foi registrado no terminal.\nTente novamente em alguns segundos.",
+                ),
             )
         )
         logger.exception(
@@ -104,10 +380,31 @@ class OficysBot(commands.Bot):
         )
 
 
+class ShardedOficysBot(OficysBot, commands.AutoShardedBot):
+    """`OficysBot` on `AutoShardedBot`: one gateway connection per shard in this process."""
+
+    def shard_latencies(self) -> list[tuple[int, float]]:
+        return self.latencies
+
+
+def create_bot() -> OficysBot:
+    if not SHARDED:
+        return OficysBot()
+    shard_count, shard_ids = get_shard_config()
+    logger.info("Sharded mode: shard_count=%s shard_ids=%s", shard_count or "auto", shard_ids or "all")
+    return ShardedOficysBot(shard_count=shard_count, shard_ids=shard_ids)
+
+
 async def run_bot() -> None:
-    bot = OficysBot()
+    bot = create_bot()
+    # `docker stop`/systemd send SIGTERM; close the bot so write-behind data is flushed.
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, bot.shutdown)
     async with bot:
         await bot.start(get_bot_token(), reconnect=True)
+    await bot.wait_closed()
+    if bot.startup_error is not None:
+        raise bot.startup_error
 
 
 if __name__ == "__main__":
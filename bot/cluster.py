@@ -0,0 +1,219 @@
+"""
+Multi-process cluster launcher.
+
+Spawns `CLUSTER_WORKERS` processes, each running a `ShardedOficysBot` that
+owns a contiguous range of the `SHARD_COUNT` shards. The supervisor restarts
+workers that crash (with backoff), collects their status over a queue and
+writes the aggregate to `data/cluster_status.json`.
+
+Workers share storage, so the cluster always uses the SQLite backend (WAL
+mode lets several processes read and write the same database). An existing
+`store.json` is migrated once by the supervisor before any worker starts.
+
+Usage: python bot/cluster.py  (or ./run_bot.sh --cluster)
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from config import CLUSTER_STATUS_INTERVAL, CLUSTER_WORKERS, get_shard_config  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
+
+
+logger = logging.getLogger("oficys.cluster")
+
+STATUS_PATH = BASE_DIR / "data" / "cluster_status.json"
+
+
+def plan_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shards 0..shard_count-1 into `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    return [list(range(w * shard_count // workers, (w + 1) * shard_count // workers)) for w in range(workers)]
+
+
+def _worker_main(worker_id: int, status: "mp.Queue[Dict[str, Any]]") -> None:
+    # Ctrl+C reaches the whole process group; let the supervisor decide when we stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging()
+    asyncio.run(_run_worker(worker_id, status))
+
+
+async def _run_worker(worker_id: int, status: "mp.Queue[Dict[str, Any]]") -> None:
+    from bot import create_bot
+    from config import get_bot_token
+    from memory import memory_report
+
+    bot = create_bot()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, bot.shutdown)
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(CLUSTER_STATUS_INTERVAL)
+            try:
+                status.put_nowait(
+                    {
+                        "worker": worker_id,
+                        "pid": os.getpid(),
+                        "at": time.time(),
+                        "guilds": len(bot.guilds),
+                        "loop_max_lag_ms": bot.loop_monitor.max_lag_ms,
+                        "memory": memory_report(bot),
+                        "shards": bot.shard_metrics.snapshot(bot.shard_latencies()),
+                    }
+                )
+            except queue.Full:
+                pass
+
+    async with bot:
+        reporter = asyncio.create_task(report())
+        try:
+            await bot.start(get_bot_token(), reconnect=True)
+        finally:
+            reporter.cancel()
+    await bot.wait_closed()
+    if bot.startup_error is not None:
+        raise bot.startup_error
+
+
+class Supervisor:
+    def __init__(self, shard_count: int, workers: int):
+        self.shard_count = shard_count
+        self.plan = plan_shards(shard_count, workers)
+        self._ctx = mp.get_context("spawn")
+        self.status: "mp.Queue[Dict[str, Any]]" = self._ctx.Queue(maxsize=1000)
+        self.procs: Dict[int, Any] = {}
+        self.restarts: Dict[int, int] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.started_at: Dict[int, float] = {}
+        self.latest: Dict[int, Dict[str, Any]] = {}
+        self._stopping = False
+
+    def _spawn(self, worker_id: int) -> None:
+        # config reads the environment at import time and spawned children
+        # inherit ours, so set the worker's layout right before starting it.
+        os.environ.update(
+            {
+                "SHARDED": "1",
+                "SHARD_COUNT": str(self.shard_count),
+                "SHARD_IDS": ",".join(map(str, self.plan[worker_id])),
+                "STORAGE_BACKEND": "sqlite",
+                "CLUSTER_WORKER": str(worker_id),
+            }
+        )
+        proc = self._ctx.Process(target=_worker_main, args=(worker_id, self.status), name=f"oficys-worker-{worker_id}")
+        proc.start()
+        self.procs[worker_id] = proc
+        self.started_at[worker_id] = time.monotonic()
+        logger.info("Worker %s started (pid=%s, shards=%s)", worker_id, proc.pid, self.plan[worker_id])
+
+    def _check_workers(self, now: float) -> None:
+        for worker_id, proc in self.procs.items():
+            if proc.is_alive() or worker_id in self.restart_at:
+                continue
+            # A worker that stayed up for a while starts its backoff over.
+            count = 0 if now - self.started_at[worker_id] > 300 else self.restarts.get(worker_id, 0)
+            delay = min(60.0, 2.0**count)
+            self.restarts[worker_id] = count + 1
+            self.restart_at[worker_id] = now + delay
+            logger.warning("Worker %s exited (code=%s); restarting in %.0fs", worker_id, proc.exitcode, delay)
+        for worker_id, when in list(self.restart_at.items()):
+            if when <= now:
+                del self.restart_at[worker_id]
+                self._spawn(worker_id)
+
+    def _drain_status(self, timeout: float) -> None:
+        try:
+            item = self.status.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            self.latest[item["worker"]] = item
+            try:
+                item = self.status.get_nowait()
+            except queue.Empty:
+                return
+
+    def _write_status(self) -> None:
+        workers = [self.latest[w] for w in sorted(self.latest)]
+        summary = {
+            "at": time.time(),
+            "shard_count": self.shard_count,
+            "workers": len(self.plan),
+            "guilds": sum(w["guilds"] for w in workers),
+            "restarts": self.restarts,
+            "per_worker": workers,
+        }
+        STATUS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATUS_PATH.with_name(STATUS_PATH.name + ".tmp")
+        tmp.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        tmp.replace(STATUS_PATH)
+        logger.info("Cluster: %s worker(s) reporting, %s guild(s)", len(workers), summary["guilds"])
+
+    def stop(self, *_: Any) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for worker_id in range(len(self.plan)):
+            self._spawn(worker_id)
+        next_status = time.monotonic() + CLUSTER_STATUS_INTERVAL
+        while not self._stopping:
+            self._drain_status(timeout=1.0)
+            self._check_workers(time.monotonic())
+            if time.monotonic() >= next_status:
+                next_status += CLUSTER_STATUS_INTERVAL
+                self._write_status()
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        logger.info("Stopping %s worker(s)", len(self.procs))
+        for proc in self.procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + 30
+        for proc in self.procs.values():
+            proc.join(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                logger.warning("Worker %s did not stop in time; killing", proc.name)
+                proc.kill()
+
+
+def _prepare_storage() -> None:
+    from storage.json_store import has_json_state
+    from storage.migrate import migrate_json_to_sqlite
+
+    json_path = BASE_DIR / "data" / "store.json"
+    db_path = BASE_DIR / "data" / "store.db"
+    if not db_path.exists() and has_json_state(json_path):
+        games, stats = migrate_json_to_sqlite(json_path, db_path)
+        logger.info("Migrated %s game(s) and %s stat row(s) from %s", games, stats, json_path)
+
+
+def main(workers: Optional[int] = None) -> None:
+    configure_logging()
+    shard_count, _ = get_shard_config()
+    workers = workers or CLUSTER_WORKERS
+    shard_count = shard_count or workers
+    if os.getenv("STORAGE_BACKEND", "json").lower() != "sqlite":
+        logger.warning("Cluster mode shares storage between processes; using the sqlite backend")
+    _prepare_storage()
+    Supervisor(shard_count, workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,26 @@
-from typing import Any, Optional, Tuple
+import io
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+import aiohttp
+import discord
+from discord import app_commands
 from discord.ext import commands
 
-from ui import error, format_filter, info, success
+from config import IMPORT_MAX_BYTES, IMPORT_MAX_ROWS
+from gamelist import FORMATS, ImportReport, detect_format, download, parse_upload, write_export
+from storage.search import normalize
+from ui import error, format_filter, info, success, template, warn
+
+
+PAGE_SIZE = 20
+FIND_LIMIT = 10
+# Problems listed in the `&gameimport` reply; the full list goes in an attachment.
+REPORT_LINES = 10
+
+# `&randomgame` mode words -> store `random_game(mode=...)`.
+RANDOM_MODES = {"peso": "weighted", "semrepetir": "bag"}
 
 
 def parse_filter(arg: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
@@ -18,74 +36,314 @@ def parse_filter(arg: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
     return comparator, int(number)
 
 
+def render_histogram(histogram: List[int], width: int = 12) -> str:
+    """One bar per rating, 10 down to 0, scaled to the most common rating."""
+    peak = max(histogram) or 1
+    lines = []
+    for rating in range(10, -1, -1):
+        count = histogram[rating]
+        bar = "█" * round(count * width / peak) if count else ""
+        lines.append(f"`{rating:>2}` {bar or '·'} {count}")
+    return "\n".join(lines)
+
+
+class GamePager(discord.ui.View):
+    """
+    Prev/next buttons over a user's game list. Each page is fetched from the
+    store's pre-sorted index with an offset query and kept for `cache_ttl`
+    seconds, so flipping back and forth doesn't hit storage again.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        user_id: int,
+        comparator: Optional[str],
+        threshold: Optional[int],
+        filter_by: Optional[str],
+        *,
+        cache_ttl: float = 30.0,
+    ):
+        super().__init__(timeout=180)
+        self.store = store
+        self.user_id = user_id
+        self.comparator = comparator
+        self.threshold = threshold
+        self.filter_by = filter_by
+        self.cache_ttl = cache_ttl
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+        self._cache: Dict[int, Tuple[float, List[Dict[str, Any]], int]] = {}
+
+    @staticmethod
+    def pages(total: int) -> int:
+        return max(1, -(-total // PAGE_SIZE))
+
+    async def fetch(self, page: int) -> Tuple[List[Dict[str, Any]], int]:
+        now = time.monotonic()
+        cached = self._cache.get(page)
+        if cached is not None and now - cached[0] < self.cache_ttl:
+            return cached[1], cached[2]
+        rows, total = await self.store.list_games_page(
+            self.user_id, self.comparator, self.threshold, offset=page * PAGE_SIZE, limit=PAGE_SIZE
+        )
+        self._cache[page] = (now, rows, total)
+        return rows, total
+
+    def render(self, rows: List[Dict[str, Any]], total: int) -> discord.Embed:
+        pages = self.pages(total)
+        self.previous.disabled = self.page <= 0
+        self.next.disabled = self.page >= pages - 1
+        lines = [f"**{g['game_name']}** — `{g['rating']}/10`" for g in rows]
+        desc = f"{format_filter(self.filter_by)}\n\n" + "\n".join(f"• {line}" for line in lines)
+        e = info("🎮 Seus jogos salvos", desc, seed=f"gameshow:{self.filter_by}")
+        e.add_field(name="Total", value=str(total), inline=True)
+        e.add_field(name="Página", value=f"{self.page + 1}/{pages}", inline=True)
+        e.add_field(name="Dica", value="Use `&randomgame >7` pra pegar só os bem avaliados.", inline=True)
+        return e
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.user_id:
+            return True
+        await interaction.response.send_message("Essa lista não é sua 😉 Use `&gameshow`.", ephemeral=True)
+        return False
+
+    async def _show(self, interaction: discord.Interaction, page: int) -> None:
+        rows, total = await self.fetch(page)
+        self.page = max(0, min(page, self.pages(total) - 1))
+        if self.page != page:
+            rows, total = await self.fetch(self.page)
+        await interaction.response.edit_message(embed=self.render(rows, total), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button["GamePager"]) -> None:
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button["GamePager"]) -> None:
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self) -> None:
+        if self.message is None:
+            return
+        self.previous.disabled = True
+        self.next.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException:
+            pass
+
+
 class Games(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    async def _bump(self, ctx: commands.Context[Any], name: str) -> None:
-        await self.bot.store.increment_stat(ctx.author.id, name)
-
-    @commands.command(name="gamedump")
+    @commands.hybrid_command(name="gamedump")
+    @app_commands.describe(body="Nome do jogo seguido da nota, ex.: The Witcher 3 10")
+    @app_commands.rename(body="jogo_e_nota")
     async def gamedump(self, ctx: commands.Context[Any], *, body: str):
         """Save or update a game with rating."""
         parts = body.split()
         if len(parts) < 2 or not parts[-1].isdigit():
-            e = error(
-                "Formato inválido",
-                "Use:\n` &gamedump <nome do jogo> <0-10> `\n\nExemplos:\n` &gamedump Minecraft 8 `\n` &gamedump The Witcher 3 10 `",
+            e = template(
+                "gamedump:usage",
+                lambda: error(
+                    "Formato inválido",
+                    "Use:\n` &gamedump <nome do jogo> <0-10> `\n\nExemplos:\n` &gamedump Minecraft 8 `\n` &gamedump The Witcher 3 10 `",
+                ),
             )
             await ctx.send(embed=e)
             return
         rating = int(parts[-1])
         if rating < 0 or rating > 10:
-            await ctx.send(embed=error("Nota inválida", "A nota precisa ser entre **0** e **10**."))
+            await ctx.send(embed=template("gamedump:rating", lambda: error("Nota inválida", "A nota precisa ser entre **0** e **10**.")))
             return
         game_name = " ".join(parts[:-1]).strip()
         if not game_name:
-            await ctx.send(embed=error("Sem nome do jogo", "Escreva o nome do jogo antes da nota."))
+            await ctx.send(embed=template("gamedump:name", lambda: error("Sem nome do jogo", "Escreva o nome do jogo antes da nota.")))
             return
+        similar = await self.bot.store.find_games(ctx.author.id, game_name, limit=1)
         await self.bot.store.add_or_update_game(ctx.author.id, game_name, rating)
-        await self._bump(ctx, "gamedump")
         stars = "⭐" * max(1, min(10, rating))
         e = success(
             "Jogo salvo!",
             f"**{game_name}**\nNota: **{rating}/10**  {stars}",
         )
+        if similar and similar[0]["game_name"].casefold() != game_name.casefold():
+            existing, typed = normalize(similar[0]["game_name"]), normalize(game_name)
+            if existing == typed or f" {typed} " in f" {existing} " or f" {existing} " in f" {typed} ":
+                e.add_field(
+                    name="Já existe um parecido",
+                    value=f"**{similar[0]['game_name']}** — se era esse, use o mesmo nome para atualizar a nota.",
+                    inline=False,
+                )
         e.add_field(name="Próximo passo", value="Veja sua lista com `&gameshow` ou peça um aleatório com `&randomgame`.", inline=False)
         await ctx.send(embed=e)
 
-    @commands.command(name="gameshow")
+    @commands.hybrid_command(name="gameshow")
+    @app_commands.describe(filter_by="Filtro por nota, ex.: >7 ou <5")
+    @app_commands.rename(filter_by="filtro")
     async def gameshow(self, ctx: commands.Context[Any], filter_by: Optional[str] = None):
-        """Show saved games, optionally filtered by rating."""
+        """Show saved games, optionally filtered by rating, with page buttons."""
         comparator, threshold = parse_filter(filter_by)
-        games = await self.bot.store.list_games(ctx.author.id, comparator, threshold)
-        await self._bump(ctx, "gameshow")
-        if not games:
+        pager = GamePager(self.bot.store, ctx.author.id, comparator, threshold, filter_by)
+        rows, total = await pager.fetch(0)
+        if not total:
             e = info("Sua lista está vazia", f"Nenhum jogo encontrado ({format_filter(filter_by)}).\n\nDica: salve um jogo com `&gamedump`.")
             await ctx.send(embed=e)
             return
-        games_sorted = sorted(games, key=lambda g: (g.get("rating", 0), g.get("game_name", "")), reverse=True)
+        if pager.pages(total) == 1:
+            await ctx.send(embed=pager.render(rows, total))
+            return
+        pager.message = await ctx.send(embed=pager.render(rows, total), view=pager)
+
+    @commands.hybrid_command(name="gamefind")
+    @app_commands.describe(query="Parte do nome do jogo (erros de digitação tudo bem)")
+    @app_commands.rename(query="busca")
+    async def gamefind(self, ctx: commands.Context[Any], *, query: str):
+        """Find saved games by name, tolerating typos and partial names."""
+        games = await self.bot.store.find_games(ctx.author.id, query, limit=FIND_LIMIT)
+        if not games:
+            e = info("Nada encontrado", f"Nenhum jogo parecido com **{query}**.\n\nDica: veja a lista completa com `&gameshow`.")
+            await ctx.send(embed=e)
+            return
+        lines = [f"• **{g['game_name']}** — `{g['rating']}/10`" for g in games]
+        e = info(f"🔎 Resultados para \"{query}\"", "\n".join(lines), seed="gamefind")
+        e.add_field(name="Dica", value="Atualize uma nota com `&gamedump <nome> <nota>` usando o nome exato.", inline=False)
+        await ctx.send(embed=e)
 
-        shown = games_sorted[:20]
-        rest = len(games_sorted) - len(shown)
-        lines = [f"**{g['game_name']}** — `{g['rating']}/10`" for g in shown]
+    async def _saved_game_choices(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        if current.strip():
+            games = await self.bot.store.find_games(interaction.user.id, current, limit=25)
+        else:
+            games, _ = await self.bot.store.list_games_page(interaction.user.id, limit=25)
+        return [
+            app_commands.Choice(name=f"{g['game_name']} ({g['rating']}/10)"[:100], value=g["game_name"][:100])
+            for g in games
+        ]
 
-        title = "🎮 Seus jogos salvos"
-        desc = f"{format_filter(filter_by)}\n\n" + "\n".join(f"• {line}" for line in lines)
-        if rest > 0:
-            desc += f"\n\n… e mais **{rest}** jogo(s). (Vou precisar de paginação pra listar tudo.)"
+    @gamefind.autocomplete("query")
+    async def gamefind_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        return await self._saved_game_choices(interaction, current)
 
-        e = info(title, desc, seed=f"gameshow:{filter_by}")
-        e.add_field(name="Total", value=str(len(games_sorted)), inline=True)
-        e.add_field(name="Dica", value="Use `&randomgame >7` pra pegar só os bem avaliados.", inline=True)
+    @commands.hybrid_command(name="gameinfo")
+    @app_commands.describe(game_name="Nome do jogo")
+    @app_commands.rename(game_name="jogo")
+    async def gameinfo(self, ctx: commands.Context[Any], *, game_name: str):
+        """Average rating and rating histogram of a game across everyone."""
+        store = self.bot.store
+        stats = await store.game_info(game_name)
+        mine = await store.find_games(ctx.author.id, game_name, limit=1)
+        if stats is None and mine:
+            # Not a known title as typed; fall back to the closest one in the user's own list.
+            stats = await store.game_info(mine[0]["game_name"])
+        if stats is None:
+            e = info("Jogo desconhecido", f"Ninguém avaliou **{game_name}** ainda.\n\nDica: seja o primeiro com `&gamedump {game_name} <nota>`.")
+            await ctx.send(embed=e)
+            return
+        e = info(f"🎮 {stats['game_name']}", render_histogram(stats["histogram"]), seed=f"gameinfo:{stats['game_name']}")
+        e.add_field(name="Média", value=f"**{stats['average']:.1f}/10**", inline=True)
+        e.add_field(name="Avaliações", value=str(stats["ratings"]), inline=True)
+        if mine and normalize(mine[0]["game_name"]) == normalize(stats["game_name"]):
+            e.add_field(name="Sua nota", value=f"{mine[0]['rating']}/10", inline=True)
+        e.add_field(name="Última avaliação", value=f"<t:{stats['updated_at']}:R>", inline=True)
+        await ctx.send(embed=e)
+
+    @gameinfo.autocomplete("game_name")
+    async def gameinfo_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        return await self._saved_game_choices(interaction, current)
+
+    @commands.hybrid_command(name="gameimport")
+    @app_commands.describe(attachment="Arquivo .csv (nome,nota) ou .json com seus jogos")
+    @app_commands.rename(attachment="arquivo")
+    async def gameimport(self, ctx: commands.Context[Any], attachment: Optional[discord.Attachment] = None):
+        """Import games (name + rating) from a CSV or JSON attachment."""
+        fmt = detect_format(attachment.filename, attachment.content_type) if attachment else None
+        if attachment is None or fmt is None:
+            e = template(
+                "gameimport:usage",
+                lambda: error(
+                    "Envie um arquivo",
+                    "Anexe um `.csv` ou `.json` à mensagem:\n"
+                    "• CSV: uma linha por jogo, `nome,nota` (cabeçalho `nome,nota` opcional; `;` também vale)\n"
+                    '• JSON: `[{"nome": "Hades", "nota": 9}, ...]` ou `[["Hades", 9], ...]`\n\n'
+                    "Dica: `&gameexport` gera um arquivo nesse formato.",
+                ),
+            )
+            await ctx.send(embed=e)
+            return
+        if attachment.size > IMPORT_MAX_BYTES:
+            await ctx.send(embed=error("Arquivo grande demais", f"O limite é **{IMPORT_MAX_BYTES // 1024} KB**."))
+            return
+        async with ctx.typing():
+            try:
+                report = await parse_upload(
+                    download(attachment.url), fmt, max_rows=IMPORT_MAX_ROWS, max_bytes=IMPORT_MAX_BYTES
+                )
+            except aiohttp.ClientError:
+                await ctx.send(embed=error("Falha no download", "Não consegui baixar o anexo. Tente de novo."))
+                return
+            if report.fatal:
+                await ctx.send(embed=error("Não consegui ler o arquivo", f"{report.fatal}.\n\nNada foi importado."))
+                return
+            added, updated = 0, 0
+            if report.games:
+                added, updated = await self.bot.store.add_or_update_games(ctx.author.id, report.accepted)
+        await self._send_report(ctx, report, added, updated)
+
+    async def _send_report(self, ctx: commands.Context[Any], report: ImportReport, added: int, updated: int) -> None:
+        if report.games:
+            e = success("Importação concluída", f"**{added}** jogo(s) novo(s) e **{updated}** nota(s) atualizada(s).")
+        else:
+            e = warn("Nada importado", "Nenhuma linha válida no arquivo.")
+        e.add_field(name="Linhas lidas", value=str(report.rows), inline=True)
+        e.add_field(name="Com problema", value=str(report.rejected), inline=True)
+        e.add_field(name="Repetidas", value=str(report.duplicates), inline=True)
+        if report.truncated:
+            e.add_field(name="Limite", value=f"Só as primeiras **{IMPORT_MAX_ROWS}** linhas foram lidas.", inline=False)
+        if report.problems:
+            shown = "\n".join(f"linha {row}: {problem}" for row, problem in report.problems[:REPORT_LINES])
+            e.add_field(name="Problemas", value=f"```\n{shown[:1000]}\n```", inline=False)
+        if len(report.problems) > REPORT_LINES:
+            report_file = discord.File(io.BytesIO(report.render().encode("utf-8")), filename="relatorio.txt")
+            await ctx.send(embed=e, file=report_file)
+            return
         await ctx.send(embed=e)
 
-    @commands.command(name="randomgame")
-    async def randomgame(self, ctx: commands.Context[Any], filter_by: Optional[str] = None):
-        """Pick a random game from saved list."""
+    @commands.hybrid_command(name="gameexport")
+    @app_commands.describe(fmt="Formato do arquivo (csv ou json)")
+    @app_commands.rename(fmt="formato")
+    @app_commands.choices(fmt=[app_commands.Choice(name=name, value=name) for name in FORMATS])
+    async def gameexport(self, ctx: commands.Context[Any], fmt: str = "csv"):
+        """Export your games as a CSV or JSON attachment."""
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            await ctx.send(embed=error("Formato inválido", "Use `&gameexport csv` ou `&gameexport json`."))
+            return
+        # Written page by page; spills to a temp file past 1 MB instead of growing in memory.
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fh:
+            count = await write_export(self.bot.store, ctx.author.id, fmt, fh)
+            if not count:
+                await ctx.send(embed=info("Sua lista está vazia", "Nada para exportar.\n\nDica: salve um jogo com `&gamedump`."))
+                return
+            fh.seek(0)
+            e = success("Exportação pronta", f"**{count}** jogo(s) em `{fmt}`. Dá pra reimportar com `&gameimport`.")
+            await ctx.send(embed=e, file=discord.File(fh, filename=f"jogos.{fmt}"))
+
+    @commands.hybrid_command(name="randomgame")
+    @app_commands.describe(options="Filtro (>7, <5) e/ou modo: peso, semrepetir")
+    @app_commands.rename(options="opcoes")
+    async def randomgame(self, ctx: commands.Context[Any], *, options: str = ""):
+        """Pick a random saved game (`peso` favours high ratings, `semrepetir` avoids repeats)."""
+        filter_by: Optional[str] = None
+        mode = "uniform"
+        for arg in options.split():
+            if arg.lower() in RANDOM_MODES:
+                mode = RANDOM_MODES[arg.lower()]
+            elif filter_by is None:
+                filter_by = arg
         comparator, threshold = parse_filter(filter_by)
-        game = await self.bot.store.random_game(ctx.author.id, comparator, threshold)
-        await self._bump(ctx, "randomgame")
+        game = await self.bot.store.random_game(ctx.author.id, comparator, threshold, mode=mode)
         if not game:
             e = info("Nada encontrado", f"Não achei nenhum jogo para escolher ({format_filter(filter_by)}).\n\nDica: tente `&gameshow`.")
             await ctx.send(embed=e)
@@ -98,7 +356,7 @@ class Games(commands.Cog):
             seed=f"random:{game['game_name']}",
         )
         e.add_field(name="Filtro", value=format_filter(filter_by), inline=True)
-        e.add_field(name="Quer trocar?", value="Rode de novo: `&randomgame`", inline=True)
+        e.add_field(name="Quer trocar?", value="Rode de novo: `&randomgame` (ou `&randomgame semrepetir`)", inline=True)
         await ctx.send(embed=e)
 
 
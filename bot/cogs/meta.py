@@ -1,50 +1,69 @@
-from typing import Any, List, Tuple
+import time
+from typing import Any, List, Optional, Tuple
 
+import discord
+from discord import app_commands
 from discord.ext import commands
 
 from config import COMMAND_PREFIX
-from ui import info
+from memory import memory_report
+from startup import timeline
+from ui import info, template
 
 
-class Meta(commands.Cog):
-    def __init__(self, bot: commands.Bot):
-        self.bot = bot
+TOP_SIZE = 10
 
-    async def _bump(self, ctx: commands.Context[Any], name: str) -> None:
-        await self.bot.store.increment_stat(ctx.author.id, name)
 
-    @commands.command(name="help")
-    async def help(self, ctx: commands.Context[Any]):
-        await self._bump(ctx, "help")
-        e = info(
-            "Oficys — Ajuda",
-            "Comandos disponíveis (prefixo `&`).\n"
-            "Dica: você pode clicar e copiar os exemplos.",
-            seed="help",
-        )
-        e.add_field(name=f"🎯 {COMMAND_PREFIX}flip a b c", value="Escolhe **uma** opção aleatória entre 2+.", inline=False)
-        e.add_field(name=f"🪙 {COMMAND_PREFIX}coin", value="Cara ou coroa.", inline=True)
-        e.add_field(name=f"🎲 {COMMAND_PREFIX}roll 20", value="Número aleatório de 1 a N.", inline=True)
-        e.add_field(name=f"🔮 {COMMAND_PREFIX}8ball vou treinar hoje?", value="Respostas estilo bola 8.", inline=False)
+def _build_help() -> discord.Embed:
+    e = info(
+        "Oficys — Ajuda",
+        "Comandos disponíveis (prefixo `&`).\n"
+        "Dica: você pode clicar e copiar os exemplos.",
+        seed="help",
+    )
+    e.add_field(name=f"🎯 {COMMAND_PREFIX}flip a b c", value="Escolhe **uma** opção aleatória entre 2+.", inline=False)
+    e.add_field(name=f"🪙 {COMMAND_PREFIX}coin", value="Cara ou coroa.", inline=True)
+    e.add_field(name=f"🎲 {COMMAND_PREFIX}roll 20", value="Número aleatório de 1 a N.", inline=True)
+    e.add_field(name=f"🔮 {COMMAND_PREFIX}8ball vou treinar hoje?", value="Respostas estilo bola 8.", inline=False)
 
-        e.add_field(name=f"🎮 {COMMAND_PREFIX}gamedump Nome do Jogo 8", value="Salva/atualiza jogo + nota (0–10).", inline=False)
-        e.add_field(name=f"📚 {COMMAND_PREFIX}gameshow", value="Lista seus jogos (use `>7` / `<7`).", inline=True)
-        e.add_field(name=f"🎁 {COMMAND_PREFIX}randomgame >7", value="Escolhe um jogo aleatório (com filtro).", inline=True)
+    e.add_field(name=f"🎮 {COMMAND_PREFIX}gamedump Nome do Jogo 8", value="Salva/atualiza jogo + nota (0–10).", inline=False)
+    e.add_field(name=f"📚 {COMMAND_PREFIX}gameshow", value="Lista seus jogos (use `>7` / `<7`).", inline=True)
+    e.add_field(name=f"🎁 {COMMAND_PREFIX}randomgame >7", value="Escolhe um jogo aleatório (com filtro).", inline=True)
+    e.add_field(name=f"🔎 {COMMAND_PREFIX}gamefind witcher", value="Procura seus jogos pelo nome (aceita erros de digitação).", inline=True)
+    e.add_field(name=f"📊 {COMMAND_PREFIX}gameinfo Hades", value="Média e distribuição das notas de todo mundo.", inline=True)
+    e.add_field(name=f"📥 {COMMAND_PREFIX}gameimport + anexo", value="Importa jogos de um `.csv`/`.json`.", inline=True)
+    e.add_field(name=f"📤 {COMMAND_PREFIX}gameexport json", value="Exporta seus jogos (`csv` ou `json`).", inline=True)
 
-        e.add_field(name=f"⏱️ {COMMAND_PREFIX}now", value="Mostra horário em vários fusos + info do dia.", inline=False)
-        e.add_field(name=f"⏳ {COMMAND_PREFIX}countdown 7", value="Contagem regressiva (edita a mensagem).", inline=True)
-        e.add_field(name=f"📅 {COMMAND_PREFIX}timeuntil 31/12/2025", value="Quanto falta até uma data.", inline=True)
+    e.add_field(name=f"⏱️ {COMMAND_PREFIX}now", value="Mostra horário em vários fusos + info do dia.", inline=False)
+    e.add_field(name=f"⏳ {COMMAND_PREFIX}countdown 7", value="Contagem regressiva (edita a mensagem).", inline=True)
+    e.add_field(name=f"📅 {COMMAND_PREFIX}timeuntil 31/12/2025", value="Quanto falta até uma data.", inline=True)
 
-        e.add_field(name=f"📊 {COMMAND_PREFIX}stats", value="Suas estatísticas de uso.", inline=True)
-        e.add_field(name=f"🧭 {COMMAND_PREFIX}help", value="Mostra esta ajuda.", inline=True)
-        await ctx.send(embed=e)
+    e.add_field(name=f"📊 {COMMAND_PREFIX}stats", value="Suas estatísticas de uso.", inline=True)
+    e.add_field(name=f"🏆 {COMMAND_PREFIX}top", value="Ranking do servidor (ou `global`).", inline=True)
+    e.add_field(name=f"🧭 {COMMAND_PREFIX}help", value="Mostra esta ajuda.", inline=True)
+    return e
 
-    @commands.command(name="stats")
+
+class Meta(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        # Build the static help embed once at load instead of on every call.
+        template("help", _build_help)
+
+    @commands.hybrid_command(name="help")
+    async def help(self, ctx: commands.Context[Any]):
+        """Show the command list."""
+        await ctx.send(embed=template("help", _build_help))
+
+    @commands.hybrid_command(name="stats")
     async def stats(self, ctx: commands.Context[Any]):
-        stats = await self.bot.store.get_stats(ctx.author.id)
-        await self._bump(ctx, "stats")
+        """Your command usage counters."""
+        stats = await self.bot.stats.get_stats(ctx.author.id)
         if not stats:
-            e = info("Stats", "Você ainda não usou nenhum comando.\n\nComece com `&help` 😉", seed="stats-empty")
+            e = template(
+                "stats-empty",
+                lambda: info("Stats", "Você ainda não usou nenhum comando.\n\nComece com `&help` 😉", seed="stats-empty"),
+            )
             await ctx.send(embed=e)
             return
         ordered: List[Tuple[str, int]] = sorted(stats.items(), key=lambda item: item[1], reverse=True)
@@ -55,6 +74,87 @@ class Meta(commands.Cog):
             e.add_field(name=f"• {name}", value=str(count), inline=True)
         await ctx.send(embed=e)
 
+    @commands.hybrid_command(name="top")
+    @app_commands.describe(scope="`global` para ver todos os servidores")
+    @app_commands.rename(scope="escopo")
+    @app_commands.choices(scope=[app_commands.Choice(name="global", value="global")])
+    async def top(self, ctx: commands.Context[Any], scope: Optional[str] = None):
+        """Server (or global) leaderboards: commands, active users and best-rated games."""
+        store = self.bot.store
+        guild_id = None if scope == "global" or ctx.guild is None else ctx.guild.id
+        commands_top = await store.top_commands(guild_id, TOP_SIZE)
+        users_top = await store.top_users(guild_id, TOP_SIZE)
+        games_top = await store.top_games(TOP_SIZE)
+        where = "global" if guild_id is None else "deste servidor"
+        e = info("🏆 Ranking", f"Ranking {where}. Use `&top global` para ver todos os servidores.", seed=f"top:{guild_id}")
+        e.add_field(
+            name="Comandos mais usados",
+            value="\n".join(f"`{count}` • {name}" for name, count in commands_top) or "—",
+            inline=True,
+        )
+        e.add_field(
+            name="Usuários mais ativos",
+            value="\n".join(f"`{count}` • <@{user_id}>" for user_id, count in users_top) or "—",
+            inline=True,
+        )
+        e.add_field(
+            name="Jogos mais bem avaliados",
+            value="\n".join(
+                f"`{g['average']:.1f}` • **{g['game_name']}** ({g['ratings']} nota(s))" for g in games_top
+            ) or "—",
+            inline=False,
+        )
+        await ctx.send(embed=e)
+
+    @commands.command(name="shards", hidden=True)
+    @commands.is_owner()
+    async def shards(self, ctx: commands.Context[Any]):
+        """Per-shard latency and event rates (owner only)."""
+        rows = self.bot.shard_metrics.snapshot(self.bot.shard_latencies())
+        e = info("Shards", f"🛰️ {len(rows)} shard(s) neste processo.", seed="shards")
+        for row in rows[:24]:
+            latency = row.get("latency_ms")
+            lines = [
+                f"latência: `{latency:.0f}ms`" if latency is not None else "latência: `—`",
+                f"msgs/s: `{row.get('messages_per_sec', 0.0):.2f}` (total {row.get('messages_total', 0)})",
+                f"cmds/s: `{row.get('commands_per_sec', 0.0):.2f}` (total {row.get('commands_total', 0)})",
+                f"reconexões: `{row.get('connects', 0)}` • resumes: `{row.get('resumes', 0)}`",
+            ]
+            e.add_field(name=f"Shard {row['shard_id']}", value="\n".join(lines), inline=True)
+        await ctx.send(embed=e)
+
+    @commands.command(name="perf", hidden=True)
+    @commands.is_owner()
+    async def perf(self, ctx: commands.Context[Any]):
+        """Hot-path latency percentiles and throughput (owner only)."""
+        metrics = self.bot.metrics
+        uptime = max(1.0, time.monotonic() - metrics.started)
+        total = sum(v for (name, _), v in metrics.counters.items() if name == "oficys_commands_total")
+        mem = memory_report(self.bot)
+        e = info(
+            "Perf",
+            f"⏱️ {total:.0f} comando(s) em {uptime / 60:.1f} min (**{total / uptime:.2f}/s**)\n"
+            f"Maior bloqueio do event loop: `{self.bot.loop_monitor.max_lag_ms:.1f}ms`\n"
+            f"Inicialização: `{timeline.summary() or '-'}`\n"
+            f"Memória: `{mem['rss_mb']:.0f}MB` ({mem['guilds']} servidor(es), `{mem['kb_per_guild']:.0f}KB`/servidor) • "
+            f"cache: `{mem['cached_members']}` membros, `{mem['cached_messages']}` mensagens, `{mem['cached_users']}` usuários",
+            seed="perf",
+        )
+        rows: List[Tuple[str, Any]] = []
+        for (name, labels), hist in sorted(metrics.histograms.items(), key=lambda item: item[1].count, reverse=True):
+            if not hist.count:
+                continue
+            label = ",".join(v for _, v in labels)
+            short = name.removeprefix("oficys_").removesuffix("_seconds")
+            rows.append((f"{short}{f' [{label}]' if label else ''}", hist))
+        for title, hist in rows[:24]:
+            e.add_field(
+                name=title[:256],
+                value=f"n=`{hist.count}` p50=`{hist.quantile(0.5) * 1000:g}ms` p99=`{hist.quantile(0.99) * 1000:g}ms`",
+                inline=False,
+            )
+        await ctx.send(embed=e)
+
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Meta(bot))
@@ -1,50 +1,29 @@
-import asyncio
 from datetime import datetime
-from typing import Any
-from zoneinfo import ZoneInfo
+from typing import Any, Optional, Tuple
 
+import discord
+from discord import app_commands
 from discord.ext import commands
 
 from config import MAIN_TIMEZONE, TIMEZONES
-from ui import error, info, success
-
-
-def _day_indicator(now: datetime) -> str:
-    symbols = ["S", "T", "Q", "Q", "S", "S", "D"]
-    today = now.weekday()  # Monday=0
-    parts = []
-    for idx, sym in enumerate(symbols):
-        if idx == today:
-            parts.append(f"**{sym}**")
-        else:
-            parts.append(sym)
-    return "  ".join(parts)
+from countdown import render
+from timeinfo import TimeInfoService
+from ui import error, info, template
 
 
 class TimeCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-
-    async def _bump(self, ctx: commands.Context[Any], name: str) -> None:
-        await self.bot.store.increment_stat(ctx.author.id, name)
-
-    @commands.command(name="now")
-    async def now(self, ctx: commands.Context[Any]):
-        """Show time in multiple zones plus day info."""
-        await self._bump(ctx, "now")
-        main = datetime.now(ZoneInfo(MAIN_TIMEZONE))
-        day_of_year = main.timetuple().tm_yday
-        is_leap = int(datetime(main.year, 12, 31, tzinfo=main.tzinfo).timetuple().tm_yday == 366)
-        total_days = 366 if is_leap else 365
-        seconds_left = int(
-            (datetime(main.year, main.month, main.day, 23, 59, 59, tzinfo=main.tzinfo) - main).total_seconds()
-        )
-        hours_left = max(0, seconds_left // 3600)
-
+        self.clock = TimeInfoService(MAIN_TIMEZONE, TIMEZONES[:20])
+        self._now_embed: Optional[Tuple[int, discord.Embed]] = None
+
+    def _render_now(self) -> discord.Embed:
+        snap = self.clock.snapshot()
+        cached = self._now_embed
+        if cached is not None and cached[0] == snap.epoch_second:
+            return cached[1]
         e = info("Agora", "⏱️ Horários e informações do dia.", seed="now")
-        for tz_name in TIMEZONES[:20]:
-            tz = ZoneInfo(tz_name)
-            current = datetime.now(tz)
+        for tz_name, current in snap.zones:
             e.add_field(
                 name=f"🕒 {tz_name}",
                 value=current.strftime("`%H:%M:%S`  •  `%d/%m/%Y`"),
@@ -53,71 +32,56 @@ class TimeCog(commands.Cog):
 
         e.add_field(
             name="📅 Hoje",
-            value=f"{main.strftime('%A')}  ({_day_indicator(main)})",
+            value=f"{snap.day.weekday}  ({snap.day.indicator})",
             inline=False,
         )
-        e.add_field(name="📌 Dia do ano", value=f"{day_of_year}/{total_days}", inline=True)
-        e.add_field(name="🌙 Horas restantes", value=str(hours_left), inline=True)
-        await ctx.send(embed=e)
+        e.add_field(name="📌 Dia do ano", value=f"{snap.day.day_of_year}/{snap.day.total_days}", inline=True)
+        e.add_field(name="🌙 Horas restantes", value=str(snap.hours_left), inline=True)
+        self._now_embed = (snap.epoch_second, e)
+        return e
 
-    @commands.command(name="countdown")
+    @commands.hybrid_command(name="now")
+    async def now(self, ctx: commands.Context[Any]):
+        """Show time in multiple zones plus day info."""
+        # Every `&now` within the same second shares one snapshot and one embed.
+        await ctx.send(embed=self._render_now())
+
+    @commands.hybrid_command(name="countdown")
+    @app_commands.describe(minutes="Duração em minutos (1–240)")
+    @app_commands.rename(minutes="minutos")
     async def countdown(self, ctx: commands.Context[Any], minutes: int):
-        """Countdown in minutes, editing the message every 15 seconds."""
+        """Countdown in minutes; the shared scheduler edits the message every 15 seconds."""
         if minutes <= 0:
-            await ctx.send(embed=error("Minutos inválidos", "Use um número **maior que 0**.\nEx: `&countdown 7`"))
+            await ctx.send(
+                embed=template("countdown:invalid", lambda: error("Minutos inválidos", "Use um número **maior que 0**.\nEx: `&countdown 7`"))
+            )
             return
         if minutes > 240:
-            await ctx.send(embed=error("Muito longo", "Máximo permitido: **240** minutos."))
+            await ctx.send(embed=template("countdown:too-long", lambda: error("Muito longo", "Máximo permitido: **240** minutos.")))
             return
 
-        total_seconds = minutes * 60
-        await self._bump(ctx, "countdown")
-        remaining = total_seconds
-
-        def bar(rem: int) -> str:
-            total = total_seconds
-            done = total - rem
-            blocks = 12
-            filled = 0 if total == 0 else int((done / total) * blocks)
-            filled = max(0, min(blocks, filled))
-            return "🟩" * filled + "⬛" * (blocks - filled)
+        scheduler = self.bot.countdowns
+        msg = await ctx.send(embed=render(minutes, minutes * 60, interval=scheduler.interval))
+        scheduler.add(msg.channel.id, msg.id, minutes)
 
-        e = info("Contagem regressiva", f"⏳ Começando: **{minutes}** minuto(s).", seed=f"countdown:{minutes}")
-        e.add_field(name="Progresso", value=bar(remaining), inline=False)
-        e.add_field(name="Restante", value=f"`{minutes}m 0s`", inline=True)
-        e.add_field(name="Atualiza", value="a cada `15s`", inline=True)
-        msg = await ctx.send(embed=e)
-        try:
-            while remaining > 0:
-                await asyncio.sleep(15)
-                remaining -= 15
-                if remaining < 0:
-                    remaining = 0
-                mins, secs = divmod(remaining, 60)
-                e.description = "⏳ Em andamento..."
-                e.set_field_at(0, name="Progresso", value=bar(remaining), inline=False)
-                e.set_field_at(1, name="Restante", value=f"`{mins}m {secs}s`", inline=True)
-                await msg.edit(embed=e)
-            end = success("Tempo esgotado!", "⏰ Bora! (Se quiser outra: `&countdown 5`)")
-            await msg.edit(embed=end)
-        except Exception:
-            # Fail silently if message was deleted or edit was blocked.
-            return
-
-    @commands.command(name="timeuntil")
+    @commands.hybrid_command(name="timeuntil")
+    @app_commands.describe(date_str="Data no formato dd/MM/YYYY")
+    @app_commands.rename(date_str="data")
     async def timeuntil(self, ctx: commands.Context[Any], *, date_str: str):
         """Time remaining until dd/MM/YYYY."""
         try:
             target_naive = datetime.strptime(date_str, "%d/%m/%Y")
         except ValueError:
-            await ctx.send(embed=error("Formato inválido", "Use `dd/MM/YYYY`.\nEx: `&timeuntil 31/12/2025`"))
+            await ctx.send(
+                embed=template("timeuntil:format", lambda: error("Formato inválido", "Use `dd/MM/YYYY`.\nEx: `&timeuntil 31/12/2025`"))
+            )
             return
-        now = datetime.now(ZoneInfo(MAIN_TIMEZONE))
+        now = self.clock.now()
         target = datetime(
             target_naive.year,
             target_naive.month,
             target_naive.day,
-            tzinfo=ZoneInfo(MAIN_TIMEZONE),
+            tzinfo=self.clock.main_zone,
         )
         delta = target - now
         if delta.total_seconds() < 0:
@@ -135,7 +99,6 @@ class TimeCog(commands.Cog):
         minutes = rem // 60
         seconds = rem % 60
 
-        await self._bump(ctx, "timeuntil")
         ts = int(target.timestamp())
         e = info("Tempo até a data", f"📍 Alvo: **{date_str}**\n⏳ Relative: <t:{ts}:R>", seed=f"timeuntil:{date_str}")
         e.add_field(name="Anos", value=str(years), inline=True)
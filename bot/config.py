@@ -9,6 +9,12 @@ load_dotenv(ENV_PATH)
 
 
 COMMAND_PREFIX = "&"
+
+# "hybrid": prefix commands (needs the privileged message-content intent) plus
+# slash commands. "slash": slash commands only; the bot asks for neither the
+# message-content nor the guild-messages intent, so guild chat traffic is not
+# delivered at all. Prefix commands then only work in DMs.
+COMMAND_MODE = os.getenv("COMMAND_MODE", "hybrid").lower()
 MAIN_TIMEZONE = "America/Sao_Paulo"
 # Additional timezones to display in the `now` command.
 TIMEZONES = [
@@ -18,6 +24,71 @@ TIMEZONES = [
     "Europe/London",
 ]
 
+# Lean gateway/cache mode (opt-in): only the intents the cogs use (guilds,
+# messages, DMs), no message cache and no member cache. Off by default so
+# existing deployments keep discord.py's defaults.
+LEAN_MODE = os.getenv("LEAN_MODE", "0") == "1"
+
+# Storage backend: "json" (bot/data/store.json) or "sqlite" (bot/data/store.db).
+# Switching to sqlite migrates an existing store.json on first start.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+
+# JsonStore write-behind: flush dirty state every N seconds, or sooner once
+# this many mutations are pending.
+STORE_FLUSH_INTERVAL = 5.0
+STORE_FLUSH_THRESHOLD = 50
+
+# Command usage counters are kept in memory and merged into the store this often.
+STATS_FLUSH_INTERVAL = 10.0
+
+# `&countdown` scheduler: edit interval, minimum gap between edits in the same
+# channel, and global cap on edits per second across all countdowns.
+COUNTDOWN_INTERVAL = 15
+COUNTDOWN_CHANNEL_SPACING = 1.0
+COUNTDOWN_MAX_EDITS_PER_SECOND = 5.0
+
+# Startup: "fast" loads extensions concurrently and reads the store in the
+# background, waiting for it only on first use; "sequential" does every step
+# in order before logging in (easier to debug).
+STARTUP_MODE = os.getenv("STARTUP_MODE", "fast").lower()
+
+# Token-bucket rate limits, checked before a command runs. Maps a command
+# name (or "*" for a budget shared by all commands) to per-scope limits of
+# (uses, per seconds); scopes are "user", "channel" and "guild".
+RATE_LIMITS = {
+    "*": {"user": (8, 10.0), "channel": (20, 10.0), "guild": (60, 10.0)},
+    "gamedump": {"user": (5, 30.0), "guild": (30, 30.0)},
+    "gameshow": {"user": (4, 20.0)},
+    "randomgame": {"user": (5, 15.0)},
+    "countdown": {"user": (2, 300.0), "channel": (3, 300.0), "guild": (10, 300.0)},
+    "stats": {"user": (3, 30.0)},
+    "gameimport": {"user": (2, 60.0)},
+    "gameexport": {"user": (2, 60.0)},
+}
+
+# `&gameimport` limits: attachment size and rows per import.
+IMPORT_MAX_BYTES = 2 * 1024 * 1024
+IMPORT_MAX_ROWS = 5000
+
+# Sharding: SHARDED=1 runs an AutoShardedBot. SHARD_COUNT/SHARD_IDS pin the
+# layout (e.g. SHARD_COUNT=4 SHARD_IDS=0,1); otherwise Discord's recommended
+# shard count is used.
+SHARDED = os.getenv("SHARDED", "0") == "1"
+
+# Cluster launcher (bot/cluster.py): number of worker processes and how often
+# they report status to the supervisor. CLUSTER_WORKER is set for each worker.
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS") or os.cpu_count() or 1)
+CLUSTER_STATUS_INTERVAL = 15.0
+CLUSTER_WORKER = os.getenv("CLUSTER_WORKER")
+
+# Prometheus-style metrics endpoint (http://METRICS_HOST:METRICS_PORT/metrics).
+# Disabled unless METRICS_PORT is set.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0) or None
+
+# Log a warning whenever the event loop is blocked for longer than this.
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "100"))
+
 
 def get_bot_token() -> str:
     token = os.getenv("BOT_TOKEN")
@@ -28,3 +99,13 @@ def get_bot_token() -> str:
 
 def get_app_id() -> str | None:
     return os.getenv("APP_ID")
+
+
+def get_shard_config() -> tuple[int | None, list[int] | None]:
+    count = os.getenv("SHARD_COUNT")
+    ids = os.getenv("SHARD_IDS")
+    shard_count = int(count) if count else None
+    shard_ids = [int(x) for x in ids.split(",") if x.strip()] if ids else None
+    if shard_ids is not None and shard_count is None:
+        raise RuntimeError("SHARD_IDS requires SHARD_COUNT to be set.")
+    return shard_count, shard_ids
@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from ui import info, success
+
+
+logger = logging.getLogger("oficys.countdown")
+
+
+@dataclass
+class Countdown:
+    channel_id: int
+    message_id: int
+    minutes: int
+    ends_at: float
+
+
+def progress_bar(total: int, remaining: int, blocks: int = 12) -> str:
+    done = total - remaining
+    filled = 0 if total == 0 else int((done / total) * blocks)
+    filled = max(0, min(blocks, filled))
+    return "🟩" * filled + "⬛" * (blocks - filled)
+
+
+def render(minutes: int, remaining: int, *, interval: int) -> discord.Embed:
+    if remaining <= 0:
+        return success("Tempo esgotado!", "⏰ Bora! (Se quiser outra: `&countdown 5`)")
+    total = minutes * 60
+    description = f"⏳ Começando: **{minutes}** minuto(s)." if remaining >= total else "⏳ Em andamento..."
+    mins, secs = divmod(remaining, 60)
+    e = info("Contagem regressiva", description, seed=f"countdown:{minutes}")
+    e.add_field(name="Progresso", value=progress_bar(total, remaining), inline=False)
+    e.add_field(name="Restante", value=f"`{mins}m {secs}s`", inline=True)
+    e.add_field(name="Atualiza", value=f"a cada `{interval}s`", inline=True)
+    return e
+
+
+class CountdownScheduler:
+    """
+    Drives every active `&countdown` from one ticker task.
+
+    Each countdown is just a heap entry keyed by its next edit time. Edits to
+    the same channel are spaced at least `channel_spacing` seconds apart and
+    the scheduler as a whole issues at most `max_edits_per_second`, so many
+    countdowns started together don't burst into Discord's rate limits.
+    Active countdowns are persisted to `path` and resumed after a restart.
+    """
+
+    def __init__(
+        self,
+        bot: Any,
+        path: Path,
+        *,
+        interval: int = 15,
+        channel_spacing: float = 1.0,
+        max_edits_per_second: float = 5.0,
+    ):
+        self.bot = bot
+        self.path = path
+        self.interval = interval
+        self.channel_spacing = channel_spacing
+        self.edit_spacing = 1.0 / max_edits_per_second
+        self._active: Dict[int, Countdown] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._channel_ready: Dict[int, float] = {}
+        self._per_channel: Dict[int, int] = {}
+        self._next_edit_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._edits: Set[asyncio.Task[None]] = set()
+        self._save_task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    async def start(self) -> None:
+        """Load persisted countdowns and start the ticker."""
+        if self._task is not None and not self._task.done():
+            return
+        for cd in await asyncio.to_thread(self._load):
+            self._track(cd)
+            heapq.heappush(self._heap, (time.time(), cd.message_id))
+        if self._active:
+            logger.info("Resuming %s countdown(s)", len(self._active))
+        self._task = asyncio.create_task(self._run(), name="countdown-scheduler")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._edits:
+            await asyncio.gather(*self._edits, return_exceptions=True)
+        if self._save_task is not None:
+            await asyncio.gather(self._save_task, return_exceptions=True)
+        await asyncio.to_thread(self._save, list(self._active.values()))
+
+    def add(self, channel_id: int, message_id: int, minutes: int) -> Countdown:
+        now = time.time()
+        cd = Countdown(channel_id=channel_id, message_id=message_id, minutes=minutes, ends_at=now + minutes * 60)
+        self._track(cd)
+        # The message was just sent, so the channel is "busy" until the spacing elapses.
+        self._channel_ready[channel_id] = max(self._channel_ready.get(channel_id, 0.0), now + self.channel_spacing)
+        heapq.heappush(self._heap, (min(now + self.interval, cd.ends_at), message_id))
+        self._wakeup.set()
+        self._schedule_save()
+        return cd
+
+    def _load(self) -> List[Countdown]:
+        if not self.path.exists():
+            return []
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8") or "[]")
+            return [Countdown(**item) for item in raw]
+        except (json.JSONDecodeError, TypeError):
+            logger.warning("Ignoring unreadable countdown file: %s", self.path)
+            return []
+
+    def _save(self, countdowns: List[Countdown]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps([asdict(cd) for cd in countdowns]), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def _schedule_save(self) -> None:
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_soon())
+
+    async def _save_soon(self) -> None:
+        # Coalesce bursts of add/finish into a single write.
+        await asyncio.sleep(1.0)
+        try:
+            await asyncio.to_thread(self._save, list(self._active.values()))
+        except Exception:
+            logger.exception("Failed to persist countdowns to %s", self.path)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.time()
+            due, message_id = self._heap[0]
+            delay = max(due, self._next_edit_at) - now
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            cd = self._active.get(message_id)
+            if cd is None:
+                continue
+            ready = self._channel_ready.get(cd.channel_id, 0.0)
+            if ready > now:
+                # Another countdown in this channel was just edited; push this one back.
+                heapq.heappush(self._heap, (ready, message_id))
+                continue
+            self._channel_ready[cd.channel_id] = now + self.channel_spacing
+            self._next_edit_at = now + self.edit_spacing
+            remaining = max(0, int(round(cd.ends_at - now)))
+            if remaining > 0:
+                heapq.heappush(self._heap, (min(now + self.interval, cd.ends_at), message_id))
+            else:
+                self._finish(cd)
+            task = asyncio.create_task(self._edit(cd, remaining))
+            self._edits.add(task)
+            task.add_done_callback(self._edits.discard)
+
+    def _track(self, cd: Countdown) -> None:
+        self._active[cd.message_id] = cd
+        self._per_channel[cd.channel_id] = self._per_channel.get(cd.channel_id, 0) + 1
+
+    def _finish(self, cd: Countdown) -> None:
+        if self._active.pop(cd.message_id, None) is None:
+            return
+        left = self._per_channel.pop(cd.channel_id) - 1
+        if left:
+            self._per_channel[cd.channel_id] = left
+        else:
+            self._channel_ready.pop(cd.channel_id, None)
+        self._schedule_save()
+
+    async def _edit(self, cd: Countdown, remaining: int) -> None:
+        message = self.bot.get_partial_messageable(cd.channel_id).get_partial_message(cd.message_id)
+        embed = render(cd.minutes, remaining, interval=self.interval)
+        try:
+            # Queued behind replies; a newer frame replaces this one if it hasn't gone out yet.
+            await self.bot.outbox.edit(cd.channel_id, cd.message_id, lambda: message.edit(embed=embed))
+        except discord.HTTPException:
+            # Message deleted or edit blocked: stop this countdown quietly.
+            self._finish(cd)
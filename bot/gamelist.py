@@ -0,0 +1,310 @@
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import IO, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+from storage.index import name_key
+
+
+FORMATS = ("csv", "json")
+MAX_NAME_LENGTH = 100
+# A single JSON item bigger than this is treated as malformed instead of
+# buffering the rest of the upload while waiting for it to close.
+MAX_ITEM_CHARS = 4096
+# Only this many problems are kept for the report; the rest are just counted.
+MAX_REPORTED = 1000
+
+NAME_FIELDS = ("game_name", "name", "nome", "jogo", "game")
+RATING_FIELDS = ("rating", "nota")
+
+
+def detect_format(filename: str, content_type: Optional[str] = None) -> Optional[str]:
+    lowered = filename.lower()
+    if lowered.endswith(".csv") or (content_type or "").startswith("text/csv"):
+        return "csv"
+    if lowered.endswith((".json", ".jsonl")) or (content_type or "").startswith("application/json"):
+        return "json"
+    return None
+
+
+def validate_row(name: Any, rating: Any) -> Tuple[Optional[Tuple[str, int]], Optional[str]]:
+    """(name, rating) ready for the store, or the reason the row was rejected."""
+    if not isinstance(name, (str, int, float)) or isinstance(name, bool):
+        return None, "nome ausente"
+    name = " ".join(str(name).split())
+    if not name:
+        return None, "nome vazio"
+    if len(name) > MAX_NAME_LENGTH:
+        return None, f"nome com mais de {MAX_NAME_LENGTH} caracteres"
+    if rating is None or rating == "":
+        return None, "nota ausente"
+    if isinstance(rating, str) and rating.strip().isdigit():
+        rating = int(rating.strip())
+    if not isinstance(rating, int) or isinstance(rating, bool):
+        return None, f"nota inválida ({str(rating)[:20]!r})"
+    if rating < 0 or rating > 10:
+        return None, f"nota fora de 0–10 ({rating})"
+    return (name, rating), None
+
+
+@dataclass
+class ImportReport:
+    """Valid rows (deduplicated by name, last one wins) plus per-row problems."""
+
+    max_rows: int
+    games: Dict[str, Tuple[str, int]] = field(default_factory=dict)
+    problems: List[Tuple[int, str]] = field(default_factory=list)
+    rows: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    truncated: bool = False
+    fatal: Optional[str] = None
+
+    def note(self, row: int, problem: str) -> None:
+        if len(self.problems) < MAX_REPORTED:
+            self.problems.append((row, problem))
+
+    def add(self, row: int, name: Any, rating: Any) -> None:
+        if self.rows >= self.max_rows:
+            self.truncated = True
+            return
+        self.rows += 1
+        game, problem = validate_row(name, rating)
+        if game is None:
+            self.rejected += 1
+            self.note(row, problem or "inválida")
+            return
+        key = name_key(game[0])
+        if key in self.games:
+            self.duplicates += 1
+            self.note(row, f"repete {self.games[key][0]!r}; vale a última")
+        self.games[key] = game
+
+    @property
+    def accepted(self) -> List[Tuple[str, int]]:
+        return list(self.games.values())
+
+    def render(self) -> str:
+        """Full plain-text report (attached to the reply when it doesn't fit in the embed)."""
+        lines = [f"linha {row}: {problem}" for row, problem in self.problems]
+        hidden = self.rejected + self.duplicates - len(self.problems)
+        if hidden > 0:
+            lines.append(f"... e mais {hidden} problema(s)")
+        return "\n".join(lines)
+
+
+class _CsvRows:
+    """
+    Incremental CSV reader: decodes chunks (UTF-8, optional BOM) and parses
+    every complete record, keeping only the unfinished last one (which may
+    span lines inside a quoted field) for the next chunk. Accepts `,` or `;`
+    (picked from the first line) and an optional header naming the
+    name/rating columns.
+    """
+
+    def __init__(self, report: ImportReport):
+        self.report = report
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._pending = ""
+        self._line = 0
+        self._delimiter: Optional[str] = None
+        self._columns: Optional[Tuple[int, int]] = None
+        self._first = True
+
+    def feed(self, chunk: bytes, final: bool = False) -> None:
+        text = self._pending + self._decoder.decode(chunk, final)
+        end = len(text) if final else _record_end(text)
+        self._pending = text[end:]
+        if not end:
+            return
+        if self._delimiter is None:
+            first = next((line for line in text[:end].splitlines() if line.strip()), None)
+            if first is not None:
+                self._delimiter = ";" if ";" in first and "," not in first else ","
+        reader = csv.reader(io.StringIO(text[:end], newline=""), delimiter=self._delimiter or ",")
+        start = self._line
+        for cells in reader:
+            self._row(start + 1, cells)
+            start = self._line + reader.line_num
+        self._line += text.count("\n", 0, end) + (final and not text.endswith("\n"))
+
+    def _row(self, line: int, cells: List[str]) -> None:
+        if len(cells) <= 1 and not "".join(cells).strip():
+            return
+        if self._first:
+            self._first = False
+            lowered = [cell.strip().lower() for cell in cells]
+            names = [i for i, cell in enumerate(lowered) if cell in NAME_FIELDS]
+            ratings = [i for i, cell in enumerate(lowered) if cell in RATING_FIELDS]
+            if names and ratings:
+                self._columns = (names[0], ratings[0])
+                return
+        if self._columns is not None:
+            name_col, rating_col = self._columns
+            name = cells[name_col] if name_col < len(cells) else None
+            rating = cells[rating_col] if rating_col < len(cells) else None
+        elif len(cells) < 2:
+            self.report.rejected += 1
+            self.report.note(line, "esperava nome e nota")
+            return
+        else:
+            # No header: the rating is the last cell, anything before it is the name
+            # (so unquoted commas inside a name still work).
+            name, rating = self._delimiter.join(cells[:-1]), cells[-1]
+        self.report.add(line, name, rating)
+
+
+def _record_end(text: str) -> int:
+    """Offset just past the last newline that isn't inside a quoted field (0 if none)."""
+    end = text.rfind("\n")
+    quotes = text.count('"', 0, end)
+    while end >= 0 and quotes % 2:
+        previous = text.rfind("\n", 0, end)
+        quotes -= text.count('"', previous + 1, end)
+        end = previous
+    return end + 1
+
+
+class _JsonRows:
+    """
+    Incremental JSON reader for a top-level array or JSON Lines. Items are
+    decoded one at a time with `raw_decode` as soon as they are complete, so
+    only the unfinished tail of the upload is ever buffered. Items are
+    objects with name/rating fields or `[name, rating]` pairs; a leading `[`
+    only opens an array when an item (or `]`) follows it, so JSON Lines of
+    pairs are read as such. Anything after the closing `]` is an error.
+    """
+
+    def __init__(self, report: ImportReport):
+        self.report = report
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._array: Optional[bool] = None
+        self._closed = False
+        self._item = 0
+
+    def feed(self, chunk: bytes, final: bool = False) -> None:
+        self._buffer += self._decoder.decode(chunk, final)
+        pos = 0
+        buffer = self._buffer
+        while not self._closed and self.report.fatal is None:
+            while pos < len(buffer) and (buffer[pos].isspace() or (self._array and buffer[pos] == ",")):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if self._array is None:
+                if buffer[pos] != "[":
+                    self._array = False
+                    continue
+                after = pos + 1
+                while after < len(buffer) and buffer[after].isspace():
+                    after += 1
+                if after >= len(buffer):
+                    if final:
+                        self.report.fatal = "JSON incompleto (falta o `]` final)"
+                    break
+                # `[{`, `[[` or `[]` open an array; `["Hades", 9]` is a JSON Lines pair.
+                self._array = buffer[after] in "[{]"
+                if self._array:
+                    pos += 1
+                continue
+            if self._array and buffer[pos] == "]":
+                self._closed = True
+                pos += 1
+                break
+            try:
+                item, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final or len(buffer) - pos > MAX_ITEM_CHARS:
+                    self.report.fatal = f"JSON inválido perto do item {self._item + 1}"
+                break
+            pos = end
+            self._item += 1
+            self._add(item)
+        self._buffer = buffer[pos:]
+        if self._closed and self._buffer.strip() and self.report.fatal is None:
+            self.report.fatal = "conteúdo depois do `]` final"
+        if final and self._array and not self._closed and self.report.fatal is None:
+            self.report.fatal = "JSON incompleto (falta o `]` final)"
+
+    def _add(self, item: Any) -> None:
+        if isinstance(item, dict):
+            lowered = {str(k).lower(): v for k, v in item.items()}
+            name = next((lowered[k] for k in NAME_FIELDS if k in lowered), None)
+            rating = next((lowered[k] for k in RATING_FIELDS if k in lowered), None)
+        elif isinstance(item, list) and len(item) == 2:
+            name, rating = item
+        else:
+            self.report.rejected += 1
+            self.report.note(self._item, "esperava um objeto com nome e nota ou um par [nome, nota]")
+            return
+        self.report.add(self._item, name, rating)
+
+
+async def parse_upload(chunks: AsyncIterator[bytes], fmt: str, *, max_rows: int, max_bytes: int) -> ImportReport:
+    """Parse an uploaded list chunk by chunk, stopping at `max_bytes` or a fatal error."""
+    report = ImportReport(max_rows=max_rows)
+    parser = _CsvRows(report) if fmt == "csv" else _JsonRows(report)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                report.fatal = f"arquivo maior que {max_bytes // 1024} KB"
+                break
+            parser.feed(chunk)
+            if report.fatal or report.truncated:
+                break
+        else:
+            parser.feed(b"", final=True)
+    except UnicodeDecodeError:
+        report.fatal = "o arquivo não está em UTF-8"
+    return report
+
+
+async def download(url: str, *, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Stream an attachment from Discord's CDN."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
+
+
+def _export_lines(fmt: str, rows: List[Dict[str, Any]], first: bool) -> Iterator[str]:
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        if first:
+            writer.writerow(["nome", "nota"])
+        writer.writerows([g["game_name"], g["rating"]] for g in rows)
+        yield out.getvalue()
+        return
+    for i, g in enumerate(rows):
+        sep = "" if first and i == 0 else ",\n"
+        yield sep + json.dumps({"game_name": g["game_name"], "rating": g["rating"]}, ensure_ascii=False)
+
+
+async def write_export(store: Any, user_id: int, fmt: str, fh: IO[bytes], *, batch: int = 500) -> int:
+    """
+    Write a user's games to `fh` page by page (best rated first), so only
+    `batch` records are held at a time. Returns how many were written.
+    """
+    written = 0
+    if fmt == "json":
+        fh.write(b"[\n")
+    while True:
+        rows, _ = await store.list_games_page(user_id, offset=written, limit=batch)
+        for text in _export_lines(fmt, rows, written == 0):
+            fh.write(text.encode("utf-8"))
+        written += len(rows)
+        if len(rows) < batch:
+            break
+    if fmt == "json":
+        fh.write(b"\n]\n")
+    return written
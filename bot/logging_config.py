@@ -1,8 +1,14 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
 
 _LEVEL_COLORS: dict[int, str] = {
@@ -17,9 +23,32 @@ _RESET = "\x1b[0m"
 _DIM = "\x1b[2m"
 
 
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _SecondClock:
+    """Formats record timestamps, re-running strftime at most once per second."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._second = -1
+        self._text = ""
+
+    def __call__(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._text = datetime.fromtimestamp(second).strftime(self.fmt)
+        return self._text
+
+
 class ColorFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__()
+        self._clock = _SecondClock("%H:%M:%S")
+
     def format(self, record: logging.LogRecord) -> str:
-        created = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        created = self._clock(record.created)
         level = record.levelname
         logger = record.name
         msg = record.getMessage()
@@ -34,35 +63,146 @@ class ColorFormatter(logging.Formatter):
         return f"{prefix} {msg}"
 
 
-def configure_logging(*, level: Optional[str] = None, log_file: Optional[str] = None) -> None:
+class PlainFormatter(logging.Formatter):
+    """`%(asctime)s %(levelname)s %(name)s %(message)s` with a per-second cached timestamp."""
+
+    def __init__(self) -> None:
+        super().__init__(fmt="%(asctime)s %(levelname)s %(name)s %(message)s")
+        self._clock = _SecondClock("%Y-%m-%d %H:%M:%S")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        return self._clock(record.created)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (for LOG_FORMAT=json)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._clock = _SecondClock("%Y-%m-%dT%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": f"{self._clock(record.created)}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    FileHandler that lets writes accumulate in the file buffer and only
+    flushes every `flush_interval` seconds (or right away for ERROR and up).
+    A timer flushes whatever is still buffered once the interval passes, so
+    the last lines before a quiet spell don't wait for the next record.
+    """
+
+    def __init__(self, filename: str, *, flush_interval: float = 1.0, encoding: str = "utf-8"):
+        super().__init__(filename, encoding=encoding)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            now = time.monotonic()
+            if record.levelno >= logging.ERROR or now - self._last_flush >= self.flush_interval:
+                self._last_flush = now
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _timed_flush(self) -> None:
+        with self.lock:
+            self._timer = None
+            self._last_flush = time.monotonic()
+            self.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        super().close()
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener lives in this process, so skip the pickling-oriented
+        # formatting of the base class: merge the args now (they may be mutated
+        # later) and leave formatting, tracebacks included, to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_logging(
+    *,
+    level: Optional[str] = None,
+    log_file: Optional[str] = None,
+    log_format: Optional[str] = None,
+) -> None:
     """
     Configure console (colored) logging + optional file logging.
 
+    Records are handed to a queue and written by a background listener
+    thread, so the event loop never waits on stdout or disk.
+
     Env vars:
       - LOG_LEVEL: DEBUG|INFO|WARNING|ERROR (default INFO)
       - LOG_FILE: path to a log file (optional)
+      - LOG_FORMAT: text|json (default text); json writes one object per line
     """
+    global _listener
     chosen_level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
     chosen_file = log_file or os.getenv("LOG_FILE")
+    as_json = (log_format or os.getenv("LOG_FORMAT") or "text").lower() == "json"
 
+    _stop_listener()
     root = logging.getLogger()
     root.handlers.clear()
     root.setLevel(chosen_level)
 
+    handlers: list[logging.Handler] = []
     console = logging.StreamHandler(stream=sys.stdout)
     console.setLevel(chosen_level)
-    console.setFormatter(ColorFormatter())
-    root.addHandler(console)
+    console.setFormatter(JsonFormatter() if as_json else ColorFormatter())
+    handlers.append(console)
 
     if chosen_file:
-        file_handler = logging.FileHandler(chosen_file, encoding="utf-8")
+        file_handler = BatchedFileHandler(chosen_file)
         file_handler.setLevel(chosen_level)
-        file_handler.setFormatter(
-            logging.Formatter(
-                fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
-        )
-        root.addHandler(file_handler)
+        file_handler.setFormatter(JsonFormatter() if as_json else PlainFormatter())
+        handlers.append(file_handler)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root.addHandler(_LocalQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Reconfiguring (cluster workers, the bench) must not stack exit hooks.
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
 
     logging.getLogger("discord").setLevel(os.getenv("DISCORD_LOG_LEVEL", "WARNING").upper())
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+
+logger = logging.getLogger("oficys.loop")
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked.
+
+    A task sleeps for `interval` seconds and records how late it wakes up; any
+    lateness is time the loop spent running something else without yielding.
+    Lags above `warn_ms` are logged.
+    """
+
+    def __init__(self, *, interval: float = 0.25, warn_ms: float = 100.0):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - started - self.interval) * 1000)
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.warn_ms:
+                logger.warning("Event loop was blocked for %.1fms", lag_ms)
@@ -1,7 +1,14 @@
 import asyncio
 
-from bot import run_bot
-from logging_config import configure_logging
+from startup import timeline
+
+with timeline.phase("import:config"):
+    import config  # noqa: F401  (loads .env)
+with timeline.phase("import:discord"):
+    import discord  # noqa: F401
+with timeline.phase("import:bot"):
+    from bot import run_bot
+    from logging_config import configure_logging
 
 
 def main() -> None:
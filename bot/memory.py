@@ -0,0 +1,29 @@
+import os
+import resource
+import sys
+from typing import Any, Dict
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the peak where /proc isn't available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere.
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report(bot: Any) -> Dict[str, Any]:
+    """Process memory per guild plus the sizes of the library caches that grow with guilds."""
+    rss = rss_bytes()
+    guilds = bot.guilds
+    return {
+        "rss_mb": rss / 2**20,
+        "guilds": len(guilds),
+        "kb_per_guild": rss / 1024 / max(1, len(guilds)),
+        "cached_members": sum(len(guild.members) for guild in guilds),
+        "cached_messages": len(bot.cached_messages),
+        "cached_users": len(bot.users),
+    }
@@ -0,0 +1,200 @@
+import asyncio
+import functools
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+
+logger = logging.getLogger("oficys.metrics")
+
+# Bucket upper bounds in seconds: 50µs .. 10s.
+BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; `observe` is a bisect plus two adds."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile (upper bound of the bucket it falls in), in seconds."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[idx] if idx < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """Registry of labelled histograms and counters."""
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.help: Dict[str, str] = {}
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        return hist
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        hist = self.histogram(name, **labels)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            hist.observe(time.perf_counter() - started)
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        seen: set = set()
+
+        def header(name: str, kind: str) -> None:
+            if name in seen:
+                return
+            seen.add(name)
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def fmt(labels: Labels, extra: str = "") -> str:
+            parts = [f'{k}="{v}"' for k, v in labels]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        for (name, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                cumulative += n
+                le = fmt(labels, f'le="{bound}"')
+                lines.append(f"{name}_bucket{le} {cumulative}")
+            le = fmt(labels, 'le="+Inf"')
+            lines.append(f"{name}_bucket{le} {hist.count}")
+            lines.append(f"{name}_sum{fmt(labels)} {hist.sum}")
+            lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, shared by the bot, the stores and `ui`.
+registry = Metrics()
+registry.describe("oficys_parse_seconds", "Time to build a command context from a message.")
+registry.describe("oficys_command_seconds", "Command handler latency, invoke to completion.")
+registry.describe("oficys_storage_seconds", "Latency of each store method.")
+registry.describe("oficys_embed_build_seconds", "Time spent constructing embeds.")
+registry.describe("oficys_send_seconds", "ctx.send round-trip to Discord, including time queued in the outbox.")
+registry.describe("oficys_store_lock_wait_seconds", "Time spent waiting for the JsonStore lock.")
+registry.describe("oficys_commands_total", "Commands invoked.")
+registry.describe("oficys_rate_limited_total", "Commands rejected by the rate limiter.")
+registry.describe("oficys_outbox_pending", "Outbound messages and edits waiting to be delivered.")
+registry.describe("oficys_outbox_channels", "Channels with queued outbound work.")
+registry.describe("oficys_outbox_wait_seconds", "Time an outbound job spent queued before delivery.")
+registry.describe("oficys_outbox_coalesced_total", "Queued edits replaced by a newer frame for the same message.")
+registry.describe("oficys_outbox_dropped_total", "Edits dropped because their channel queue was full.")
+
+
+class TimedStore:
+    """
+    Wraps a store so every public coroutine method is timed into
+    `oficys_storage_seconds{method=...}`. Anything else passes through.
+    """
+
+    def __init__(self, store: Any, metrics: Metrics = registry):
+        self._store = store
+        self._metrics = metrics
+        self._wrapped: Dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._store, name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            hist = self._metrics.histogram("oficys_storage_seconds", method=name)
+
+            @functools.wraps(attr)
+            async def wrapped(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    hist.observe(time.perf_counter() - started)
+
+            self._wrapped[name] = wrapped
+        return wrapped
+
+
+class MetricsServer:
+    """Serves `registry` in Prometheus text format on http://host:port/metrics."""
+
+    def __init__(self, host: str, port: int, metrics: Metrics = registry):
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Metrics endpoint: http://%s:%s/metrics", self.host, self.port)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from metrics import Metrics, registry
+
+
+logger = logging.getLogger("oficys.outbox")
+
+Factory = Callable[[], Awaitable[Any]]
+Job = Tuple[float, Factory, "asyncio.Future[Any]"]
+
+
+class _ChannelQueue:
+    __slots__ = ("replies", "edits", "task")
+
+    def __init__(self) -> None:
+        self.replies: Deque[Job] = deque()
+        # message_id -> newest pending edit; older frames are replaced in place.
+        self.edits: "OrderedDict[int, Job]" = OrderedDict()
+        self.task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self.replies) + len(self.edits)
+
+
+class Outbox:
+    """
+    Outbound delivery with one queue per channel.
+
+    Jobs are zero-argument coroutine factories (e.g. `lambda: channel.send(...)`)
+    and callers get a future for the result. Each channel is drained by its own
+    short-lived task, one request at a time, so a rate-limited channel only
+    delays itself. Within a channel, replies always go before background edits.
+    Edits are keyed by message: a newer frame for a message that is still
+    queued replaces the old one (both callers get the newest result).
+
+    Replies and edits draw from separate concurrency pools (`max_inflight` and
+    `max_background`), so a backlog of edits can't hold the slots replies need.
+    Channels with more than `max_pending` queued jobs drop new edits.
+
+    Delivery goes through discord.py's HTTP client, so pointing
+    `discord.http.Route.BASE` at a local mock server exercises the whole path.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_inflight: int = 16,
+        max_background: int = 4,
+        max_pending: int = 50,
+        metrics: Metrics = registry,
+    ):
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self._reply_slots = asyncio.Semaphore(max_inflight)
+        self._edit_slots = asyncio.Semaphore(max_background)
+        self._channels: Dict[int, _ChannelQueue] = {}
+        self._pending = 0
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _queue(self, channel_id: int) -> _ChannelQueue:
+        queue = self._channels.get(channel_id)
+        if queue is None:
+            queue = self._channels[channel_id] = _ChannelQueue()
+        return queue
+
+    def _kick(self, channel_id: int, queue: _ChannelQueue) -> None:
+        self._set_gauges()
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._drain(channel_id, queue), name=f"outbox-{channel_id}")
+
+    def _set_gauges(self) -> None:
+        self.metrics.set("oficys_outbox_pending", self._pending)
+        self.metrics.set("oficys_outbox_channels", len(self._channels))
+
+    def send(self, channel_id: int, factory: Factory) -> "asyncio.Future[Any]":
+        """Queue an interactive reply for `channel_id`."""
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        if self._closed:
+            future.set_exception(RuntimeError("Outbox is closed"))
+            return future
+        queue = self._queue(channel_id)
+        queue.replies.append((time.perf_counter(), factory, future))
+        self._pending += 1
+        self._kick(channel_id, queue)
+        return future
+
+    def edit(self, channel_id: int, message_id: int, factory: Factory) -> "asyncio.Future[Any]":
+        """Queue a background edit of `message_id`, superseding any edit still queued for it."""
+        queue = self._queue(channel_id)
+        queued = queue.edits.get(message_id)
+        if queued is not None:
+            queue.edits[message_id] = (queued[0], factory, queued[2])
+            self.metrics.inc("oficys_outbox_coalesced_total")
+            return queued[2]
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        if self._closed or len(queue) >= self.max_pending:
+            self.metrics.inc("oficys_outbox_dropped_total")
+            future.cancel()
+            if not queue:
+                del self._channels[channel_id]
+            return future
+        queue.edits[message_id] = (time.perf_counter(), factory, future)
+        self._pending += 1
+        self._kick(channel_id, queue)
+        return future
+
+    async def _drain(self, channel_id: int, queue: _ChannelQueue) -> None:
+        try:
+            while queue:
+                if queue.replies:
+                    kind, slots = "reply", self._reply_slots
+                    enqueued_at, factory, future = queue.replies.popleft()
+                else:
+                    kind, slots = "edit", self._edit_slots
+                    _, (enqueued_at, factory, future) = queue.edits.popitem(last=False)
+                self._pending -= 1
+                if future.done():
+                    continue
+                async with slots:
+                    self.metrics.observe("oficys_outbox_wait_seconds", time.perf_counter() - enqueued_at, kind=kind)
+                    try:
+                        result = await factory()
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                    except Exception as exc:
+                        if not future.done():
+                            future.set_exception(exc)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            for _, _, future in (*queue.replies, *queue.edits.values()):
+                future.cancel()
+            self._pending -= len(queue)
+            if self._channels.get(channel_id) is queue:
+                del self._channels[channel_id]
+            self._set_gauges()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop taking edits, give queued jobs `timeout` seconds to go out, then cancel the rest."""
+        self._closed = True
+        tasks = [queue.task for queue in self._channels.values() if queue.task is not None]
+        if not tasks:
+            return
+        _, stuck = await asyncio.wait(tasks, timeout=timeout)
+        for task in stuck:
+            task.cancel()
+        if stuck:
+            logger.warning("Dropped outbound messages for %s channel(s) on shutdown", len(stuck))
+            await asyncio.gather(*stuck, return_exceptions=True)
@@ -0,0 +1,107 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+
+# (uses, per seconds), same shape as `commands.cooldown(rate, per)`.
+Limit = Tuple[int, float]
+
+SCOPES = {
+    "user": commands.BucketType.user,
+    "channel": commands.BucketType.channel,
+    "guild": commands.BucketType.guild,
+}
+
+
+class RateLimited(commands.CommandOnCooldown):
+    """
+    Raised by `OficysBot.invoke` for a rejected command. `notify` is False for
+    repeated rejections of the same bucket, so spam doesn't turn into replies.
+    """
+
+    def __init__(self, scope: str, limit: Limit, retry_after: float, notify: bool):
+        super().__init__(commands.Cooldown(*limit), retry_after, SCOPES[scope])
+        self.scope = scope
+        self.notify = notify
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by (scope, id, rule), where a rule is a command name or
+    "*" (a budget shared by every command). A command passes only if every
+    bucket that applies to it has a token; tokens are taken from all of them
+    at once, so a rejection never drains the others.
+
+    Each bucket is a (tokens, updated_at, warned) tuple. A bucket that has
+    refilled completely is indistinguishable from a missing one, so `sweep`
+    drops those every `sweep_interval` seconds; memory tracks only the users,
+    channels and guilds that are actually being throttled.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, Limit]], *, sweep_interval: float = 60.0):
+        for rules in limits.values():
+            unknown = set(rules) - set(SCOPES)
+            if unknown:
+                raise ValueError(f"Unknown rate limit scope(s): {', '.join(sorted(unknown))}")
+        self.limits = limits
+        self.sweep_interval = sweep_interval
+        self._buckets: Dict[Tuple[str, int, str], Tuple[float, float, bool]] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _rules(self, command: str) -> List[Tuple[str, str, Limit]]:
+        rules = [(scope, "*", limit) for scope, limit in self.limits.get("*", {}).items()]
+        rules.extend((scope, command, limit) for scope, limit in self.limits.get(command, {}).items())
+        return rules
+
+    def hit(
+        self,
+        command: str,
+        user_id: int,
+        channel_id: int,
+        guild_id: Optional[int],
+        now: Optional[float] = None,
+    ) -> Optional[RateLimited]:
+        """Take a token for `command`; returns the error to raise if it is rate limited."""
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self.sweep(now)
+        ids = {"user": user_id, "channel": channel_id, "guild": guild_id}
+        keys: List[Tuple[Tuple[str, int, str], float]] = []
+        rejected: Optional[Tuple[str, Limit, float, Tuple[str, int, str], float]] = None
+        for scope, rule, (uses, per) in self._rules(command):
+            ident = ids[scope]
+            if ident is None:
+                continue
+            key = (scope, ident, rule)
+            state = self._buckets.get(key)
+            tokens = float(uses) if state is None else min(uses, state[0] + (now - state[1]) * uses / per)
+            if tokens < 1:
+                retry_after = (1 - tokens) * per / uses
+                if rejected is None or retry_after > rejected[2]:
+                    rejected = (scope, (uses, per), retry_after, key, tokens)
+            keys.append((key, tokens))
+        if rejected is not None:
+            scope, limit, retry_after, key, tokens = rejected
+            warned = key in self._buckets and self._buckets[key][2]
+            self._buckets[key] = (tokens, now, True)
+            return RateLimited(scope, limit, retry_after, notify=not warned)
+        for key, tokens in keys:
+            self._buckets[key] = (tokens - 1, now, False)
+        return None
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop buckets that have refilled completely. Returns how many were removed."""
+        now = time.monotonic() if now is None else now
+        self._next_sweep = now + self.sweep_interval
+        idle = []
+        for key, (tokens, updated_at, _) in self._buckets.items():
+            limit = self.limits.get(key[2], {}).get(key[0])
+            if limit is None or tokens + (now - updated_at) * limit[0] / limit[1] >= limit[0]:
+                idle.append(key)
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
@@ -0,0 +1,59 @@
+import math
+import time
+from typing import Any, Dict, List, Tuple
+
+
+class RateCounter:
+    """Events per second over a sliding window, kept as one counter per second."""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.total = 0
+        self._slots = [0] * window
+        self._stamps = [0] * window
+
+    def add(self, n: int = 1) -> None:
+        second = int(time.monotonic())
+        idx = second % self.window
+        if self._stamps[idx] != second:
+            self._stamps[idx] = second
+            self._slots[idx] = 0
+        self._slots[idx] += n
+        self.total += n
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        recent = sum(count for count, stamp in zip(self._slots, self._stamps) if now - stamp < self.window)
+        return recent / self.window
+
+
+class ShardMetrics:
+    """Per-shard event rates and connection counters."""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self._events: Dict[Tuple[int, str], RateCounter] = {}
+        self._lifecycle: Dict[int, Dict[str, int]] = {}
+
+    def record(self, shard_id: int, kind: str) -> None:
+        counter = self._events.get((shard_id, kind))
+        if counter is None:
+            counter = self._events[(shard_id, kind)] = RateCounter(self.window)
+        counter.add()
+
+    def lifecycle(self, shard_id: int, kind: str) -> None:
+        per_shard = self._lifecycle.setdefault(shard_id, {})
+        per_shard[kind] = per_shard.get(kind, 0) + 1
+
+    def snapshot(self, latencies: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """One row per shard: latency (ms), event totals and per-second rates, lifecycle counts."""
+        rows: Dict[int, Dict[str, Any]] = {}
+        for shard_id, latency in latencies:
+            rows[shard_id] = {"shard_id": shard_id, "latency_ms": latency * 1000 if math.isfinite(latency) else None}
+        for (shard_id, kind), counter in self._events.items():
+            row = rows.setdefault(shard_id, {"shard_id": shard_id, "latency_ms": None})
+            row[f"{kind}_total"] = counter.total
+            row[f"{kind}_per_sec"] = counter.rate()
+        for shard_id, counts in self._lifecycle.items():
+            rows.setdefault(shard_id, {"shard_id": shard_id, "latency_ms": None}).update(counts)
+        return [rows[k] for k in sorted(rows)]
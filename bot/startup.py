@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+
+class StartupTimeline:
+    """
+    Wall-clock breakdown of a boot: imports, setup_hook steps, time to ready.
+
+    `started` is taken when this module is first imported, which `main.py`
+    does before anything else, so `since_start()` covers the whole process.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_after: Optional[float] = None
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def mark_ready(self) -> bool:
+        """Record time to the first READY. Returns False if it was already recorded."""
+        if self.ready_after is not None:
+            return False
+        self.ready_after = self.since_start()
+        return True
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases]
+        if self.ready_after is not None:
+            parts.append(f"ready={self.ready_after * 1000:.0f}ms")
+        return " ".join(parts)
+
+
+timeline = StartupTimeline()
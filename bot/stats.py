@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger("oficys.stats")
+
+Deltas = Dict[int, Dict[str, int]]
+
+
+def _merge_into(target: Deltas, deltas: Deltas) -> None:
+    for user_id, per_user in deltas.items():
+        bucket = target.setdefault(user_id, {})
+        for command, count in per_user.items():
+            bucket[command] = bucket.get(command, 0) + count
+
+
+class StatsAggregator:
+    """
+    Counts command usage in memory and merges the deltas into the store in
+    one write every `flush_interval` seconds (and on shutdown).
+
+    `record` is synchronous, so replies never wait on persistence.
+    `get_stats` returns the stored counters plus anything not flushed yet.
+    """
+
+    def __init__(self, store: Any, *, flush_interval: float = 10.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: Deltas = {}
+        # guild_id -> per-user deltas, for the per-guild leaderboards.
+        self._guild_pending: Dict[int, Deltas] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        # The last merge handed to the store; it outlives a cancelled flush.
+        self._writing: Optional["asyncio.Future[None]"] = None
+
+    def record(self, user_id: int, command: str, guild_id: Optional[int] = None) -> None:
+        per_user = self._pending.setdefault(user_id, {})
+        per_user[command] = per_user.get(command, 0) + 1
+        if guild_id:
+            per_guild = self._guild_pending.setdefault(guild_id, {}).setdefault(user_id, {})
+            per_guild[command] = per_guild.get(command, 0) + 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="stats-aggregator")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush command stats")
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            deltas, self._pending = self._pending, {}
+            guilds, self._guild_pending = self._guild_pending, {}
+            self._writing = write = asyncio.ensure_future(self.store.merge_stats(deltas, guilds=guilds))
+            write.add_done_callback(lambda done: self._write_done(done, deltas, guilds))
+            # Shielded: cancelling a flush (e.g. from `close`) must not abandon a
+            # merge the store may already have committed.
+            await asyncio.shield(write)
+
+    def _write_done(self, write: "asyncio.Future[None]", deltas: Deltas, guilds: Dict[int, Deltas]) -> None:
+        if not write.cancelled() and write.exception() is None:
+            return
+        # The write failed: put the deltas back so they are retried on the next flush.
+        _merge_into(self._pending, deltas)
+        for guild_id, per_guild in guilds.items():
+            _merge_into(self._guild_pending.setdefault(guild_id, {}), per_guild)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None:
+            await asyncio.wait([self._writing])
+        await self.flush()
+
+    async def get_stats(self, user_id: int) -> Dict[str, int]:
+        # Holding the lock keeps a flush from landing between the store read
+        # and the pending lookup, which would count those deltas twice.
+        async with self._lock:
+            stats = await self.store.get_stats(user_id)
+            for command, count in self._pending.get(user_id, {}).items():
+                stats[command] = stats.get(command, 0) + count
+        return stats
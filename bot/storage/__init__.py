@@ -1 +1,24 @@
-# Storage package for JSON persistence.
+# Storage package: JSON (default) and SQLite persistence backends.
+from pathlib import Path
+from typing import Union
+
+from .json_store import JsonStore
+from .lazy import LazyStore
+from .sqlite_store import SqliteStore
+
+Store = Union[JsonStore, SqliteStore]
+
+
+def create_store(backend: str, data_dir: Path, *, flush_interval: float = 5.0, flush_threshold: int = 50) -> Store:
+    """
+    Build the store selected by `backend` ("json" or "sqlite").
+
+    The first time the SQLite backend starts next to an existing `store.json`,
+    that file is migrated into `store.db`. Nothing touches disk until `start()`.
+    """
+    json_path = data_dir / "store.json"
+    if backend == "json":
+        return JsonStore(json_path, flush_interval=flush_interval, flush_threshold=flush_threshold)
+    if backend == "sqlite":
+        return SqliteStore(data_dir / "store.db", migrate_from=json_path)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
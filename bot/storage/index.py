@@ -0,0 +1,169 @@
+import random
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .sampling import pick_weighted, rating_weight
+from .search import NameSearch, normalize
+
+
+_rng = random.Random()
+
+
+def name_key(game_name: str) -> str:
+    return game_name.strip().casefold()
+
+
+def game_key(game_name: str) -> str:
+    """
+    Key for per-game aggregates across users: ignores case, accents and
+    punctuation, so "Pokémon: Red" and "pokemon red" count as one game.
+    """
+    return normalize(game_name) or name_key(game_name)
+
+
+def rating_matches(rating: int, comparator: Optional[str], threshold: Optional[int]) -> bool:
+    if not comparator or threshold is None:
+        return True
+    if comparator == ">":
+        return rating > threshold
+    if comparator == "<":
+        return rating < threshold
+    return True
+
+
+class GameIndex:
+    """
+    Per-user indexes over the game records held by a store.
+
+    Each user gets a casefolded-name -> record map (for upserts/lookups) and a
+    set of rating buckets, each kept sorted by name. Ratings are 0-10, so a
+    `>N`/`<N` filter touches at most 11 buckets no matter how large the whole
+    catalog is. A `NameSearch` per user backs fuzzy lookups by name. Records
+    are the store's own dicts; the index never copies them.
+    """
+
+    def __init__(self) -> None:
+        self._by_name: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._by_rating: Dict[int, Dict[int, List[Tuple[str, str]]]] = {}
+        self._search: Dict[int, NameSearch] = {}
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Index a new record. Returns False if the user already has that name."""
+        user_id = record["user_id"]
+        key = name_key(record["game_name"])
+        names = self._by_name.setdefault(user_id, {})
+        if key in names:
+            return False
+        names[key] = record
+        buckets = self._by_rating.setdefault(user_id, {})
+        insort(buckets.setdefault(record["rating"], []), (record["game_name"], key))
+        self._search.setdefault(user_id, NameSearch()).add(key, record["game_name"], record)
+        return True
+
+    def get(self, user_id: int, game_name: str) -> Optional[Dict[str, Any]]:
+        return self._by_name.get(user_id, {}).get(name_key(game_name))
+
+    def set_rating(self, record: Dict[str, Any], rating: int) -> None:
+        """Change an indexed record's rating, moving it between buckets."""
+        old = record["rating"]
+        if old == rating:
+            return
+        buckets = self._by_rating[record["user_id"]]
+        entry = (record["game_name"], name_key(record["game_name"]))
+        bucket = buckets[old]
+        del bucket[bisect_left(bucket, entry)]
+        if not bucket:
+            del buckets[old]
+        record["rating"] = rating
+        insort(buckets.setdefault(rating, []), entry)
+
+    def count(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> int:
+        buckets = self._by_rating.get(user_id, {})
+        return sum(len(b) for r, b in buckets.items() if rating_matches(r, comparator, threshold))
+
+    def iter_sorted(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Yield a user's records by rating, then name, both descending."""
+        names = self._by_name.get(user_id, {})
+        buckets = self._by_rating.get(user_id, {})
+        for rating in sorted(buckets, reverse=True):
+            if not rating_matches(rating, comparator, threshold):
+                continue
+            for _, key in reversed(buckets[rating]):
+                yield names[key]
+
+    def page(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        One page of `iter_sorted` plus the total match count. Whole buckets
+        before `offset` are skipped by length, so the cost is the number of
+        buckets plus `limit`, not the size of the list.
+        """
+        names = self._by_name.get(user_id, {})
+        buckets = self._by_rating.get(user_id, {})
+        rows: List[Dict[str, Any]] = []
+        total = 0
+        skip = offset
+        for rating in sorted(buckets, reverse=True):
+            if not rating_matches(rating, comparator, threshold):
+                continue
+            bucket = buckets[rating]
+            size = len(bucket)
+            total += size
+            if skip >= size:
+                skip -= size
+                continue
+            want = limit - len(rows)
+            if want > 0:
+                # Buckets are ascending; walk them from the end for descending order.
+                end = size - skip
+                for _, key in reversed(bucket[max(0, end - want) : end]):
+                    rows.append(names[key])
+            skip = 0
+        return rows, total
+
+    def names(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        """The user's casefolded-name -> record map (live, do not mutate)."""
+        return self._by_name.get(user_id, {})
+
+    def search(self, user_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The user's records whose names best match `query` (typos and partial words allowed)."""
+        search = self._search.get(user_id)
+        return [record for _, record in search.search(query, limit)] if search else []
+
+    def keys(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> List[str]:
+        buckets = self._by_rating.get(user_id, {})
+        return [key for r, b in buckets.items() if rating_matches(r, comparator, threshold) for _, key in b]
+
+    def sample(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        weighted: bool = False,
+        rng: Optional[random.Random] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Random record matching the filter without building a list: choose a
+        rating bucket by size (times rating+1 when `weighted`), then an index
+        inside it. At most 11 buckets, so this is constant time.
+        """
+        rng = rng or _rng
+        buckets = self._by_rating.get(user_id, {})
+        choices = [
+            (bucket, rating_weight(r, len(bucket), weighted))
+            for r, bucket in buckets.items()
+            if rating_matches(r, comparator, threshold)
+        ]
+        if not choices:
+            return None
+        bucket = pick_weighted(choices, rng)
+        _, key = bucket[rng.randrange(len(bucket))]
+        return self._by_name[user_id][key]
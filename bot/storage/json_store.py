@@ -1,86 +1,441 @@
 import asyncio
 import json
+import logging
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .index import GameIndex, name_key, rating_matches
+from .leaderboard import GLOBAL, GuildDeltas, Leaderboards
+from .sampling import ShuffleBags
+
+
+logger = logging.getLogger("oficys.storage")
+
+T = TypeVar("T")
+
+# Journal entries, one JSON array per line:
+#   [seq, "g", user_id, game_name, rating, created_at, updated_at]
+#                                                        game upsert
+#   [seq, "G", user_id, [[game_name, rating, created_at, updated_at], ...]]
+#                                                        batch of upserts (imports)
+# updated_at may be missing from older entries; it then defaults to created_at.
+#   [seq, "s", {user_id: {command: count}}, {guild_id: {user_id: {command: count}}}]
+#                                                        stat deltas (guild part optional)
+Op = List[Any]
+
+
+class StoreCorruptedError(RuntimeError):
+    """The snapshot on disk can't be parsed; the bot refuses to start rather than wipe it."""
+
+
+def journal_path(path: Path) -> Path:
+    return path.with_suffix(".journal")
+
+
+def has_json_state(path: Path) -> bool:
+    return path.exists() or journal_path(path).exists()
+
+
+def _empty() -> Dict[str, Any]:
+    return {"seq": 0, "games": [], "command_stats": {}, "guild_stats": {}}
+
+
+def read_snapshot(path: Path) -> Dict[str, Any]:
+    raw = path.read_text(encoding="utf-8") if path.exists() else ""
+    if not raw.strip():
+        return _empty()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise StoreCorruptedError(f"{path} is not valid JSON ({exc}); fix or move it aside to start fresh") from exc
+    data.setdefault("seq", 0)
+    data.setdefault("games", [])
+    data.setdefault("command_stats", {})
+    data.setdefault("guild_stats", {})
+    return data
+
+
+def read_journal(path: Path, after_seq: int = 0) -> Iterator[Op]:
+    """
+    Yield journal entries newer than `after_seq`, each sequence number once
+    (a retried append can leave a duplicate). A torn last line (crash
+    mid-append) is skipped.
+    """
+    if not path.exists():
+        return
+    last = after_seq
+    with path.open(encoding="utf-8") as fh:
+        lines = fh.readlines()
+    for lineno, line in enumerate(lines, 1):
+        try:
+            op = json.loads(line)
+        except json.JSONDecodeError:
+            if lineno == len(lines):
+                logger.warning("Ignoring incomplete last entry in %s", path)
+            else:
+                logger.error("Skipping unreadable entry at %s:%s", path, lineno)
+            continue
+        if op[0] > last:
+            last = op[0]
+            yield op
+
+
+def _merge_user_stats(stats: Dict[str, Dict[str, int]], deltas: Dict[Any, Dict[str, int]]) -> None:
+    for user_id, per_user in deltas.items():
+        user_stats = stats.setdefault(str(user_id), {})
+        for command, count in per_user.items():
+            user_stats[command] = user_stats.get(command, 0) + count
+
+
+def _merge_guild_stats(guild_stats: Dict[str, Dict[str, Dict[str, int]]], guilds: Dict[Any, Dict[Any, Dict[str, int]]]) -> None:
+    """Fold per-guild user deltas into {guild: {"commands": {...}, "users": {...}}} totals."""
+    for guild_id, per_user in guilds.items():
+        totals = guild_stats.setdefault(str(guild_id), {"commands": {}, "users": {}})
+        for user_id, per_command in per_user.items():
+            for command, count in per_command.items():
+                totals["commands"][command] = totals["commands"].get(command, 0) + count
+                totals["users"][str(user_id)] = totals["users"].get(str(user_id), 0) + count
+
+
+def build_leaderboards(data: Dict[str, Any]) -> Leaderboards:
+    boards = Leaderboards()
+    commands: Dict[str, int] = {}
+    users: Dict[int, int] = {}
+    for user_id, per_user in data["command_stats"].items():
+        users[int(user_id)] = sum(per_user.values())
+        for command, count in per_user.items():
+            commands[command] = commands.get(command, 0) + count
+    boards.load_scope(GLOBAL, commands, users)
+    for guild_id, totals in data["guild_stats"].items():
+        boards.load_scope(int(guild_id), totals["commands"], {int(u): n for u, n in totals["users"].items()})
+    # Oldest change first, so a user's most recently rated alias of a game is the one
+    # that counts (changes within the same second keep list order).
+    for record in sorted(data["games"], key=lambda g: g.get("updated_at", g["created_at"])):
+        boards.rate_game(record["user_id"], record["game_name"], record["rating"], record.get("updated_at", record["created_at"]))
+    return boards
+
+
+def apply_ops(data: Dict[str, Any], ops: Iterable[Op]) -> None:
+    """Replay journal entries onto a plain snapshot dict (no index needed)."""
+    names = {(g["user_id"], name_key(g["game_name"])): g for g in data["games"]}
+    stats: Dict[str, Dict[str, int]] = data["command_stats"]
+
+    def upsert(user_id: int, game_name: str, rating: int, created_at: int, updated_at: Optional[int] = None) -> None:
+        record = names.get((user_id, name_key(game_name)))
+        if record is not None:
+            record["rating"] = rating
+        else:
+            record = {"user_id": user_id, "game_name": game_name, "rating": rating, "created_at": created_at}
+            data["games"].append(record)
+            names[(user_id, name_key(game_name))] = record
+        record["updated_at"] = updated_at or created_at
+
+    for op in ops:
+        if op[1] == "g":
+            upsert(*op[2:])
+        elif op[1] == "G":
+            for entry in op[3]:
+                upsert(op[2], *entry)
+        elif op[1] == "s":
+            _merge_user_stats(stats, op[2])
+            if len(op) > 3:
+                _merge_guild_stats(data["guild_stats"], op[3])
+        data["seq"] = max(data["seq"], op[0])
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    """Last snapshot at `path` plus everything in its journal."""
+    data = read_snapshot(path)
+    apply_ops(data, read_journal(journal_path(path), data["seq"]))
+    return data
 
 
 class JsonStore:
-    def __init__(self, path: Path):
+    """
+    JSON store with an in-memory working copy, an append-only journal and
+    periodic compact snapshots.
+
+    `start()` loads the last snapshot (`store.json`) and replays the journal
+    (`store.journal`) on top of it; reads are then served from memory.
+    Mutations are applied in memory and queued as journal entries, which a
+    background task appends (and fsyncs) every `flush_interval` seconds, or
+    sooner once `flush_threshold` entries are pending. A flush is a small
+    append, not a rewrite of the whole document.
+
+    Once the journal passes `compact_bytes`, the worker thread folds it into
+    a new minified snapshot (temp file + atomic rename) and truncates it.
+    Entries carry a sequence number and the snapshot records the last one it
+    contains, so a crash at any point replays each entry exactly once. An
+    unreadable snapshot raises `StoreCorruptedError` instead of starting empty.
+
+    All file I/O and (de)serialization runs on a dedicated worker thread.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 50,
+        compact_bytes: int = 4 * 1024 * 1024,
+    ):
         self.path = path
+        self.journal = journal_path(path)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.compact_bytes = compact_bytes
+        # Optional hook receiving how long each flush waited for `_lock`, in seconds.
+        self.on_lock_wait: Optional[Callable[[float], None]] = None
         self._lock = asyncio.Lock()
-        self._ensure_file()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="json-store")
+        self._data: Dict[str, Any] = _empty()
+        self._games = GameIndex()
+        self._boards = Leaderboards()
+        self._bags = ShuffleBags()
+        self._seq = 0
+        self._ops: List[Op] = []
+        self._wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        # Journal append running on the worker thread, if any.
+        self._appending: Optional["asyncio.Future[int]"] = None
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
 
-    def _ensure_file(self) -> None:
+    def _trim_torn_tail(self) -> None:
+        # Drop a partial last line so new appends don't get glued onto it.
+        if not self.journal.exists():
+            return
+        with self.journal.open("rb+") as fh:
+            raw = fh.read()
+            if raw and not raw.endswith(b"\n"):
+                fh.truncate(raw.rfind(b"\n") + 1)
+
+    def _load(self) -> Tuple[Dict[str, Any], GameIndex, Leaderboards]:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.path.exists():
-            self.path.write_text(json.dumps({"games": [], "command_stats": {}}), encoding="utf-8")
+        data = load_state(self.path)
+        self._trim_torn_tail()
+        index = GameIndex()
+        for record in data["games"]:
+            index.add(record)
+        return data, index, build_leaderboards(data)
 
-    def _read(self) -> Dict[str, Any]:
-        raw = self.path.read_text(encoding="utf-8")
-        try:
-            data = json.loads(raw) if raw else {}
-        except json.JSONDecodeError:
-            data = {}
-        data.setdefault("games", [])
-        data.setdefault("command_stats", {})
-        return data
+    def _append(self, ops: List[Op]) -> int:
+        """Append entries to the journal and fsync; returns the journal size."""
+        text = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops)
+        with self.journal.open("a", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+            return fh.tell()
 
-    def _write(self, data: Dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    def _compact(self) -> None:
+        """Fold the journal into a new snapshot, then truncate it. Runs on the worker thread."""
+        data = load_state(self.path)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        # A crash before this line only leaves entries the snapshot's `seq` already covers.
+        with self.journal.open("w", encoding="utf-8") as fh:
+            os.fsync(fh.fileno())
+        logger.info("Compacted %s (%s games, seq=%s)", self.path, len(data["games"]), data["seq"])
 
-    async def add_or_update_game(self, user_id: int, game_name: str, rating: int) -> None:
+    def _log(self, op: Op) -> None:
+        self._seq += 1
+        op.insert(0, self._seq)
+        self._ops.append(op)
+        if len(self._ops) >= self.flush_threshold:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Load snapshot + journal from disk and start the background flusher."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._data, self._games, self._boards = await self._run(self._load)
+        self._seq = self._data["seq"]
+        self._flush_task = asyncio.create_task(self._flush_loop(), name="json-store-flusher")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush store journal %s", self.journal)
+
+    async def flush(self, *, compact: bool = False) -> None:
+        started = time.perf_counter()
         async with self._lock:
-            data = self._read()
-            games: List[Dict[str, Any]] = data["games"]
-            updated = False
-            for item in games:
-                if item["user_id"] == user_id and item["game_name"].lower() == game_name.lower():
-                    item["rating"] = rating
-                    updated = True
-                    break
-            if not updated:
-                games.append(
-                    {
-                        "user_id": user_id,
-                        "game_name": game_name,
-                        "rating": rating,
-                        "created_at": int(time.time()),
-                    }
-                )
-            data["games"] = games
-            self._write(data)
+            if self.on_lock_wait is not None:
+                self.on_lock_wait(time.perf_counter() - started)
+            size = None
+            if self._ops:
+                ops, self._ops = self._ops, []
+                self._appending = append = asyncio.ensure_future(self._run(self._append, ops))
+                append.add_done_callback(lambda done: self._append_done(done, ops))
+                # Shielded: cancelling a flush (e.g. from `close`) must not abandon a
+                # write the worker thread may already have made.
+                size = await asyncio.shield(append)
+            if compact or (size is not None and size >= self.compact_bytes):
+                await self._run(self._compact)
+
+    def _append_done(self, append: "asyncio.Future[int]", ops: List[Op]) -> None:
+        if self._appending is append:
+            self._appending = None
+        if append.cancelled() or append.exception() is not None:
+            # Keep the entries so the next flush retries them, in order.
+            self._ops[:0] = ops
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._appending is not None:
+            # Let an append interrupted by the cancel finish (or re-queue its entries) first.
+            await asyncio.wait([self._appending])
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def _upsert(self, user_id: int, game_name: str, rating: int) -> Tuple[Dict[str, Any], bool]:
+        """Apply one upsert in memory; returns the record and whether it is new."""
+        now = int(time.time())
+        record = self._games.get(user_id, game_name)
+        if record is not None:
+            self._boards.rate_game(user_id, record["game_name"], rating, now)
+            self._games.set_rating(record, rating)
+            record["updated_at"] = now
+            return record, False
+        record = {
+            "user_id": user_id,
+            "game_name": game_name,
+            "rating": rating,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._data["games"].append(record)
+        self._games.add(record)
+        self._boards.rate_game(user_id, game_name, rating, now)
+        return record, True
+
+    async def add_or_update_game(self, user_id: int, game_name: str, rating: int) -> None:
+        record, _ = self._upsert(user_id, game_name, rating)
+        self._log(["g", user_id, game_name, rating, record["created_at"], record["updated_at"]])
+
+    async def add_or_update_games(self, user_id: int, games: List[Tuple[str, int]]) -> Tuple[int, int]:
+        """
+        Upsert many (name, rating) pairs for one user as a single journal entry,
+        so a crash keeps all of them or none. Returns (added, updated).
+        """
+        entries = []
+        added = 0
+        for game_name, rating in games:
+            record, new = self._upsert(user_id, game_name, rating)
+            added += new
+            entries.append([game_name, rating, record["created_at"], record["updated_at"]])
+        if entries:
+            self._log(["G", user_id, entries])
+        return added, len(entries) - added
 
     async def list_games(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> List[Dict[str, Any]]:
-        async with self._lock:
-            data = self._read()
-        games = [g for g in data["games"] if g["user_id"] == user_id]
-        if comparator and threshold is not None:
-            if comparator == ">":
-                games = [g for g in games if g["rating"] > threshold]
-            elif comparator == "<":
-                games = [g for g in games if g["rating"] < threshold]
-        return games
-
-    async def random_game(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> Optional[Dict[str, Any]]:
-        games = await self.list_games(user_id, comparator, threshold)
-        if not games:
-            return None
-        import random
-
-        return random.choice(games)
-
-    async def increment_stat(self, user_id: int, command: str) -> None:
-        async with self._lock:
-            data = self._read()
-            stats: Dict[str, Dict[str, int]] = data["command_stats"]
-            user_stats = stats.get(str(user_id), {})
-            user_stats[command] = user_stats.get(command, 0) + 1
-            stats[str(user_id)] = user_stats
-            data["command_stats"] = stats
-            self._write(data)
+        return [dict(g) for g in self._games.iter_sorted(user_id, comparator, threshold)]
+
+    async def list_games_page(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of `list_games` (same order) and the total number of matches."""
+        rows, total = self._games.page(user_id, comparator, threshold, offset=offset, limit=limit)
+        return [dict(g) for g in rows], total
+
+    async def find_games(self, user_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The user's games whose names best match `query`, best match first."""
+        return [dict(g) for g in self._games.search(user_id, query, limit)]
+
+    async def random_game(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        mode: str = "uniform",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Random game matching the filter. `mode` is "uniform", "weighted"
+        (chance proportional to rating+1) or "bag" (no repeats until every
+        matching game has been drawn once).
+        """
+        if mode == "bag":
+            names = self._games.names(user_id)
+
+            def resolve(key: str) -> Optional[Dict[str, Any]]:
+                record = names.get(key)
+                if record is None or not rating_matches(record["rating"], comparator, threshold):
+                    return None
+                return record
+
+            game = self._bags.draw(
+                (user_id, comparator, threshold), lambda: self._games.keys(user_id, comparator, threshold), resolve
+            )
+        else:
+            game = self._games.sample(user_id, comparator, threshold, weighted=mode == "weighted")
+        return dict(game) if game else None
+
+    async def increment_stat(self, user_id: int, command: str, guild_id: Optional[int] = None) -> None:
+        await self.merge_stats({user_id: {command: 1}}, guilds={guild_id: {user_id: {command: 1}}} if guild_id else None)
+
+    async def merge_stats(self, deltas: Dict[int, Dict[str, int]], *, guilds: Optional[GuildDeltas] = None) -> None:
+        """Add per-user (and optionally per-guild) command counters in one mutation."""
+        _merge_user_stats(self._data["command_stats"], deltas)
+        for user_id, per_user in deltas.items():
+            for command, count in per_user.items():
+                self._boards.add_usage(GLOBAL, user_id, command, count)
+        op: Op = ["s", {str(uid): dict(per_user) for uid, per_user in deltas.items()}]
+        if guilds:
+            _merge_guild_stats(self._data["guild_stats"], guilds)
+            for guild_id, per_guild in guilds.items():
+                for user_id, per_user in per_guild.items():
+                    for command, count in per_user.items():
+                        self._boards.add_usage(guild_id, user_id, command, count)
+            op.append({str(gid): {str(uid): dict(c) for uid, c in per_guild.items()} for gid, per_guild in guilds.items()})
+        self._log(op)
 
     async def get_stats(self, user_id: int) -> Dict[str, int]:
-        async with self._lock:
-            data = self._read()
-        return data["command_stats"].get(str(user_id), {})
+        return dict(self._data["command_stats"].get(str(user_id), {}))
+
+    async def top_commands(self, guild_id: Optional[int] = None, limit: int = 10) -> List[Tuple[str, int]]:
+        return self._boards.top_commands(guild_id or GLOBAL, limit)
+
+    async def top_users(self, guild_id: Optional[int] = None, limit: int = 10) -> List[Tuple[int, int]]:
+        return self._boards.top_users(guild_id or GLOBAL, limit)
+
+    async def top_games(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best average rating across users (ties: more ratings first)."""
+        return self._boards.top_games(limit)
+
+    async def game_info(self, game_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate ratings of a game across users (matched by `game_key`):
+        game_name, ratings, average, histogram (11 counts, for 0-10) and updated_at.
+        """
+        stats = self._boards.game_info(game_name)
+        return stats.as_dict() if stats else None
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger("oficys.storage")
+
+
+class LazyStore:
+    """
+    Defers a store's `start()` until it is first needed.
+
+    `start()` only schedules the load in the background and returns; every
+    other public coroutine method waits for that load (kicking it off if
+    nobody has yet), so the bot can log in while the store is read from disk
+    and nothing touches the store before its data is in memory. A failed load
+    is reported to `on_error`, which the bot uses to shut down instead of
+    running without its data.
+    """
+
+    def __init__(self, store: Any, *, on_error: Optional[Callable[[BaseException], None]] = None):
+        self._store = store
+        self.on_error = on_error
+        self._loading: Optional[asyncio.Task[None]] = None
+        self._wrapped: Dict[str, Callable[..., Any]] = {}
+        self.load_seconds: Optional[float] = None
+
+    async def _load(self) -> None:
+        started = asyncio.get_running_loop().time()
+        try:
+            await self._store.start()
+        except Exception as exc:
+            logger.exception("Failed to load the store")
+            if self.on_error is not None:
+                self.on_error(exc)
+            raise
+        self.load_seconds = asyncio.get_running_loop().time() - started
+        logger.info("Store loaded in %.0fms", self.load_seconds * 1000)
+
+    def _ensure(self) -> "asyncio.Task[None]":
+        failed = self._loading is not None and self._loading.done() and (self._loading.cancelled() or self._loading.exception())
+        if self._loading is None or failed:
+            # First use, or the last attempt failed: (re)try the load.
+            self._loading = asyncio.create_task(self._load(), name="store-load")
+        return self._loading
+
+    async def start(self) -> None:
+        self._ensure()
+
+    async def close(self) -> None:
+        if self._loading is None:
+            return
+        (result,) = await asyncio.gather(self._loading, return_exceptions=True)
+        if isinstance(result, BaseException):
+            # Never loaded: closing would write the empty state over the files.
+            return
+        await self._store.close()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._store, name)
+        if name.startswith("_") or not asyncio.iscoroutinefunction(attr):
+            return attr
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+
+            @functools.wraps(attr)
+            async def wrapped(*args: Any, **kwargs: Any) -> Any:
+                await self._ensure()
+                return await attr(*args, **kwargs)
+
+            self._wrapped[name] = wrapped
+        return wrapped
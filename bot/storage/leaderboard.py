@@ -0,0 +1,159 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from .index import game_key
+
+
+K = TypeVar("K", bound=Hashable)
+
+# guild_id -> user_id -> command -> count; guild 0 is the global scope.
+GuildDeltas = Dict[int, Dict[int, Dict[str, int]]]
+
+GLOBAL = 0
+
+
+class TopK(Generic[K]):
+    """
+    Scores per key plus a cached, sorted top-`k` list.
+
+    Increases only ever touch the cached list (a sort of at most k+1 items).
+    Lowering the score of a key that is in the list marks it stale, and the
+    next `top()` rebuilds it with one `nlargest` pass; counters never go down,
+    so for them reads are always O(k).
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.scores: Dict[K, Any] = {}
+        self._top: List[Tuple[Any, K]] = []
+        self._stale = False
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def set(self, key: K, score: Any) -> None:
+        old = self.scores.get(key)
+        self.scores[key] = score
+        if self._stale:
+            return
+        in_top = old is not None and any(k == key for _, k in self._top)
+        if in_top and score < old:
+            self._stale = True
+            return
+        if in_top:
+            self._top = [(score if k == key else s, k) for s, k in self._top]
+        elif len(self._top) < self.k or score > self._top[-1][0]:
+            self._top.append((score, key))
+        else:
+            return
+        self._top.sort(key=lambda item: item[0], reverse=True)
+        del self._top[self.k :]
+
+    def add(self, key: K, delta: int) -> None:
+        self.set(key, self.scores.get(key, 0) + delta)
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[K, Any]]:
+        if self._stale:
+            self._top = heapq.nlargest(self.k, ((s, k) for k, s in self.scores.items()), key=lambda item: item[0])
+            self._stale = False
+        return [(key, score) for score, key in self._top[: limit or self.k]]
+
+
+@dataclass
+class GameStats:
+    """Ratings of one game across users: count, sum, 0-10 histogram and last change (epoch seconds)."""
+
+    game_name: str
+    ratings: int = 0
+    rating_sum: int = 0
+    histogram: List[int] = field(default_factory=lambda: [0] * 11)
+    updated_at: int = 0
+
+    def rate(self, old: Optional[int], new: int, at: int) -> None:
+        if old is None:
+            self.ratings += 1
+        else:
+            self.rating_sum -= old
+            self.histogram[old] -= 1
+        self.rating_sum += new
+        self.histogram[new] += 1
+        self.updated_at = max(self.updated_at, at)
+
+    @property
+    def average(self) -> float:
+        return self.rating_sum / self.ratings if self.ratings else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "game_name": self.game_name,
+            "ratings": self.ratings,
+            "average": self.average,
+            "histogram": list(self.histogram),
+            "updated_at": self.updated_at,
+        }
+
+
+class Leaderboards:
+    """
+    In-memory leaderboards for `JsonStore`: command and user totals per guild
+    (and globally, scope 0), per-game rating aggregates keyed by `game_key`,
+    and the best-rated games across users, updated as stats are merged and
+    games are upserted. Each user counts once per game: records of one user
+    that share a `game_key` ("Pokémon", "Pokemon") contribute the rating of
+    whichever was rated last.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.commands: Dict[int, TopK[str]] = {}
+        self.users: Dict[int, TopK[int]] = {}
+        self.games = TopK[str](k)
+        self.game_stats: Dict[str, GameStats] = {}
+        # (user_id, game_key) -> the rating that user contributes to game_stats.
+        self.user_ratings: Dict[Tuple[int, str], int] = {}
+
+    def _board(self, boards: Dict[int, "TopK[Any]"], scope: int) -> "TopK[Any]":
+        board = boards.get(scope)
+        if board is None:
+            board = boards[scope] = TopK(self.k)
+        return board
+
+    def add_usage(self, scope: int, user_id: int, command: str, count: int) -> None:
+        self._board(self.commands, scope).add(command, count)
+        self._board(self.users, scope).add(user_id, count)
+
+    def load_scope(self, scope: int, commands: Dict[str, int], users: Dict[int, int]) -> None:
+        """Seed a scope's boards from stored totals (used once at load)."""
+        for command, count in commands.items():
+            self._board(self.commands, scope).add(command, count)
+        for user_id, count in users.items():
+            self._board(self.users, scope).add(user_id, count)
+
+    def rate_game(self, user_id: int, game_name: str, rating: int, at: int) -> None:
+        """Account for `user_id` rating `game_name` `rating` at `at`, replacing their earlier rating of that game."""
+        key = game_key(game_name)
+        stats = self.game_stats.get(key)
+        if stats is None:
+            stats = self.game_stats[key] = GameStats(game_name)
+        old = self.user_ratings.get((user_id, key))
+        self.user_ratings[user_id, key] = rating
+        stats.rate(old, rating, at)
+        self.games.set(key, (stats.average, stats.ratings))
+
+    def game_info(self, game_name: str) -> Optional[GameStats]:
+        return self.game_stats.get(game_key(game_name))
+
+    def top_commands(self, scope: int = GLOBAL, limit: int = 10) -> List[Tuple[str, int]]:
+        board = self.commands.get(scope)
+        return board.top(limit) if board else []
+
+    def top_users(self, scope: int = GLOBAL, limit: int = 10) -> List[Tuple[int, int]]:
+        board = self.users.get(scope)
+        return board.top(limit) if board else []
+
+    def top_games(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = []
+        for key, (average, count) in self.games.top(limit):
+            rows.append({"game_name": self.game_stats[key].game_name, "average": average, "ratings": count})
+        return rows
@@ -0,0 +1,120 @@
+"""
+One-shot migration from the JSON store to SQLite.
+
+Usage (from the `bot/` directory):
+
+    python -m storage.migrate data/store.json data/store.db
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from .index import name_key
+from .json_store import build_leaderboards, load_state
+from .sqlite_store import HISTOGRAM, USAGE_UPSERT, connect
+
+
+def migrate_json_to_sqlite(json_path: Path, db_path: Path) -> Tuple[int, int]:
+    """
+    Copy games and command stats from `json_path` (snapshot plus journal)
+    into `db_path`.
+
+    Runs in a single transaction. Games already present in the database are
+    left untouched and stat counters are added on top of existing ones, so the
+    migration is meant to run once against a fresh database. A new database
+    is built next to `db_path` and only moved into place once everything is
+    committed, so a failed migration never leaves an empty store behind (the
+    store skips the migration once the file exists).
+    Returns (games inserted, stat rows merged).
+    """
+    data = load_state(json_path)
+    if db_path.exists():
+        return _migrate(data, db_path)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    _remove_db(tmp_path)
+    try:
+        result = _migrate(data, tmp_path)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        _remove_db(tmp_path)
+        raise
+    return result
+
+
+def _remove_db(path: Path) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def _migrate(data: Dict[str, Any], db_path: Path) -> Tuple[int, int]:
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            games = conn.executemany(
+                "INSERT OR IGNORE INTO games (user_id, game_name, name_key, rating, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        int(g["user_id"]),
+                        g["game_name"],
+                        name_key(g["game_name"]),
+                        int(g["rating"]),
+                        int(g.get("created_at") or time.time()),
+                    )
+                    for g in data.get("games", [])
+                ),
+            ).rowcount
+            stats = conn.executemany(
+                "INSERT INTO command_stats (user_id, command, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, command) DO UPDATE SET count = count + excluded.count",
+                (
+                    (int(user_id), command, int(count))
+                    for user_id, per_user in data.get("command_stats", {}).items()
+                    for command, count in per_user.items()
+                ),
+            ).rowcount
+            # Global usage totals are rebuilt from command_stats when the store opens.
+            conn.executemany(
+                USAGE_UPSERT,
+                (
+                    (int(guild_id), kind, str(key), int(count))
+                    for guild_id, totals in data.get("guild_stats", {}).items()
+                    for kind, field in (("c", "commands"), ("u", "users"))
+                    for key, count in totals[field].items()
+                ),
+            )
+            # Copied rather than rebuilt so last-updated times survive (`games` only has created_at).
+            boards = build_leaderboards(data)
+            conn.executemany(
+                f"INSERT OR IGNORE INTO game_stats (game_key, game_name, ratings, rating_sum, {HISTOGRAM}, updated_at) "
+                f"VALUES ({', '.join('?' * 16)})",
+                (
+                    (key, g.game_name, g.ratings, g.rating_sum, *g.histogram, g.updated_at)
+                    for key, g in boards.game_stats.items()
+                ),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO game_ratings (user_id, game_key, rating) VALUES (?, ?, ?)",
+                ((int(user_id), key, rating) for (user_id, key), rating in boards.user_ratings.items()),
+            )
+        # Back to a single file so the database can be renamed as a whole.
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+    return games, stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate the Oficys JSON store to SQLite.")
+    parser.add_argument("json_path", type=Path)
+    parser.add_argument("db_path", type=Path)
+    args = parser.parse_args()
+    games, stats = migrate_json_to_sqlite(args.json_path, args.db_path)
+    print(f"Migrated {games} game(s) and {stats} stat row(s) into {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
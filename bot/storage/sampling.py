@@ -0,0 +1,61 @@
+import random
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+RANDOM_MODES = ("uniform", "weighted", "bag")
+
+
+def pick_weighted(items: List[Tuple[Any, int]], rng: random.Random) -> Any:
+    """Pick an item from (item, weight) pairs with probability proportional to weight."""
+    total = sum(w for _, w in items)
+    point = rng.randrange(total)
+    for item, weight in items:
+        point -= weight
+        if point < 0:
+            return item
+    return items[-1][0]
+
+
+def rating_weight(rating: int, size: int, weighted: bool) -> int:
+    # Weighted mode gives each game rating+1 tickets, so 0-rated games still show up.
+    return size * (rating + 1) if weighted else size
+
+
+class ShuffleBags:
+    """
+    "No repeats until exhausted" draws, one bag per (user, filter).
+
+    A bag is a shuffled list of game keys that is popped from the end. Keys
+    are validated when drawn (the game may have been re-rated or the filter
+    no longer matches), and an empty bag is refilled with a fresh shuffle, so
+    the O(n) refill is paid once per n draws. Games added mid-cycle join the
+    next refill. At most `max_bags` bags are kept, least recently used first out.
+    """
+
+    def __init__(self, max_bags: int = 10_000, rng: Optional[random.Random] = None):
+        self.max_bags = max_bags
+        self._rng = rng or random.Random()
+        self._bags: "OrderedDict[Hashable, List[str]]" = OrderedDict()
+
+    def draw(self, bag_key: Hashable, refill: Callable[[], List[str]], resolve: Callable[[str], Optional[T]]) -> Optional[T]:
+        bag = self._bags.pop(bag_key, None) or []
+        refilled = False
+        result: Optional[T] = None
+        while result is None:
+            if not bag:
+                if refilled:
+                    break
+                bag = refill()
+                self._rng.shuffle(bag)
+                refilled = True
+                if not bag:
+                    break
+            result = resolve(bag.pop())
+        if bag:
+            self._bags[bag_key] = bag
+            while len(self._bags) > self.max_bags:
+                self._bags.popitem(last=False)
+        return result
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(name: str) -> str:
+    """Casefold, drop accents and punctuation: "Pokémon: Red!" -> "pokemon red"."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    # Only Latin diacritics (U+0300-U+036F) go; e.g. Japanese voicing marks stay.
+    stripped = unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not "\u0300" <= ch <= "\u036f"))
+    return _NON_WORD.sub(" ", stripped).strip()
+
+
+def trigrams(tokens: List[str], *, closed: bool = True) -> FrozenSet[str]:
+    # Two leading spaces give every word start its own grams ("  w", " wi"),
+    # which is what prefix matches key on. A query leaves its last word open
+    # so "witc" doesn't require a word boundary after the "c".
+    grams: Set[str] = set()
+    for i, token in enumerate(tokens):
+        padded = f"  {token}" if not closed and i == len(tokens) - 1 else f"  {token} "
+        grams.update(padded[j : j + 3] for j in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class NameSearch:
+    """
+    Fuzzy lookup over one user's game names.
+
+    Names are normalized, split into words and indexed by word trigrams
+    (gram -> keys). A query counts shared grams per name, keeps up to
+    `rerank` names with at least half the best count, and scores those by
+    gram coverage plus how closely each query word matches (prefix or edit
+    similarity) the name's best word. Typos ("wticher") and partial input ("witc") both match, and
+    the cost follows the names that share grams, not the whole list. `add`
+    updates the index in place.
+    """
+
+    def __init__(self, *, rerank: int = 30) -> None:
+        self.rerank = rerank
+        self._postings: Dict[str, Set[str]] = {}
+        # key -> (normalized name, words, payload)
+        self._items: Dict[str, Tuple[str, List[str], Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: str, name: str, payload: Any) -> None:
+        """Index `name` under `key`, or just replace the payload if `key` is already indexed."""
+        item = self._items.get(key)
+        if item is not None:
+            self._items[key] = (item[0], item[1], payload)
+            return
+        norm = normalize(name)
+        tokens = norm.split()
+        self._items[key] = (norm, tokens, payload)
+        for gram in trigrams(tokens):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def search(self, query: str, limit: int = 10, *, min_score: float = 0.5) -> List[Tuple[float, Any]]:
+        """Up to `limit` (score, payload) pairs, best first; scores are roughly 0-1.2."""
+        qnorm = normalize(query)
+        qtokens = qnorm.split()
+        if not qtokens:
+            return []
+        qgrams = trigrams(qtokens, closed=False)
+        hits: Counter[str] = Counter()
+        for gram in qgrams:
+            postings = self._postings.get(gram)
+            if postings:
+                hits.update(postings)
+        # Query words are the matchers' second sequence, which difflib
+        # preprocesses once; name words are swapped in as the first. Words
+        # repeat across titles ("the", "2", "mario"), so each pair is compared once.
+        matchers = {q: SequenceMatcher(None, "", q) for q in qtokens}
+        similarity: Dict[Tuple[str, str], float] = {}
+
+        def best(q: str, tokens: List[str]) -> float:
+            top = 0.0
+            for t in tokens:
+                value = similarity.get((q, t))
+                if value is None:
+                    matcher = matchers[q]
+                    matcher.set_seq1(t)
+                    if t.startswith(q):
+                        value = 1.0
+                    elif matcher.real_quick_ratio() <= top:
+                        continue
+                    else:
+                        value = matcher.ratio()
+                    similarity[q, t] = value
+                top = max(top, value)
+            return top
+
+        scored: List[Tuple[float, str, Any]] = []
+        candidates = hits.most_common(self.rerank)
+        floor = candidates[0][1] / 2 if candidates else 0
+        for key, shared in candidates:
+            if shared < floor:
+                break
+            norm, tokens, payload = self._items[key]
+            words = sum(best(q, tokens) for q in qtokens) / len(qtokens)
+            score = 0.5 * shared / len(qgrams) + 0.5 * words
+            if qnorm in norm:
+                score += 0.2
+            if score >= min_score:
+                scored.append((score, norm, payload))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, payload) for score, _, payload in scored[:limit]]
@@ -0,0 +1,508 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from .index import game_key, name_key
+from .json_store import has_json_state
+from .leaderboard import GLOBAL, GuildDeltas
+from .sampling import ShuffleBags, pick_weighted, rating_weight
+from .search import NameSearch
+
+
+logger = logging.getLogger("oficys.storage")
+
+T = TypeVar("T")
+
+# Name indexes are built from the table on first use and kept up to date by
+# local upserts; the TTL bounds staleness when other processes share the file.
+SEARCH_TTL = 60.0
+SEARCH_USERS = 1_000
+
+SCHEMA = """
+-- name_key is index.name_key(game_name) (stripped, casefolded), computed in
+-- Python so names are unique per user exactly as in JsonStore; SQLite's
+-- lower() only folds ASCII. Its unique index is created by `upgrade_games`.
+CREATE TABLE IF NOT EXISTS games (
+    user_id INTEGER NOT NULL,
+    game_name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_user_rating ON games (user_id, rating);
+
+CREATE TABLE IF NOT EXISTS command_stats (
+    user_id INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, command)
+) WITHOUT ROWID;
+
+-- Leaderboard aggregates, updated in the same transaction as the rows they
+-- summarize. scope is a guild id (0 = global); kind is 'c' (key = command)
+-- or 'u' (key = user id).
+CREATE TABLE IF NOT EXISTS usage_totals (
+    scope INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, kind, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS usage_totals_rank ON usage_totals (scope, kind, count DESC);
+
+-- Ratings of each game across users, keyed by game_key() (case, accents and
+-- punctuation folded). r0..r10 is the rating histogram; updated_at is the
+-- last change in epoch seconds. Replaces the older game_totals table.
+DROP TABLE IF EXISTS game_totals;
+CREATE TABLE IF NOT EXISTS game_stats (
+    game_key TEXT PRIMARY KEY,
+    game_name TEXT NOT NULL,
+    ratings INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    r0 INTEGER NOT NULL DEFAULT 0, r1 INTEGER NOT NULL DEFAULT 0, r2 INTEGER NOT NULL DEFAULT 0,
+    r3 INTEGER NOT NULL DEFAULT 0, r4 INTEGER NOT NULL DEFAULT 0, r5 INTEGER NOT NULL DEFAULT 0,
+    r6 INTEGER NOT NULL DEFAULT 0, r7 INTEGER NOT NULL DEFAULT 0, r8 INTEGER NOT NULL DEFAULT 0,
+    r9 INTEGER NOT NULL DEFAULT 0, r10 INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS game_stats_rank ON game_stats (CAST(rating_sum AS REAL) / ratings DESC, ratings DESC);
+
+-- The rating each user contributes to game_stats: one per game_key, so a
+-- user's records that fold to the same key ("Pokémon", "Pokemon") count
+-- once, with the rating of the last one rated.
+CREATE TABLE IF NOT EXISTS game_ratings (
+    user_id INTEGER NOT NULL,
+    game_key TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    PRIMARY KEY (user_id, game_key)
+) WITHOUT ROWID;
+"""
+
+HISTOGRAM = ", ".join(f"r{i}" for i in range(11))
+
+USAGE_UPSERT = (
+    "INSERT INTO usage_totals (scope, kind, key, count) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (scope, kind, key) DO UPDATE SET count = count + excluded.count"
+)
+
+
+def usage_rows(deltas: Dict[int, Dict[str, int]], guilds: Optional[GuildDeltas] = None) -> Iterator[Tuple[int, str, str, int]]:
+    """`usage_totals` increments for global per-user deltas plus optional per-guild ones."""
+    scoped = [(GLOBAL, deltas), *((guild_id, per_guild) for guild_id, per_guild in (guilds or {}).items())]
+    for scope, per_scope in scoped:
+        for user_id, per_user in per_scope.items():
+            yield scope, "u", str(user_id), sum(per_user.values())
+            for command, count in per_user.items():
+                yield scope, "c", command, count
+
+
+def _bucket(rating: int) -> str:
+    """Histogram column for `rating`; validated because it is interpolated into SQL."""
+    if not 0 <= rating <= 10:
+        raise ValueError(f"Rating out of range: {rating}")
+    return f"r{int(rating)}"
+
+
+def _rating_clause(comparator: Optional[str], threshold: Optional[int]) -> Tuple[str, Tuple[Any, ...]]:
+    if comparator == ">" and threshold is not None:
+        return " AND rating > ?", (threshold,)
+    if comparator == "<" and threshold is not None:
+        return " AND rating < ?", (threshold,)
+    return "", ()
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Several cluster workers may share the file; wait for the write lock instead of failing.
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.executescript(SCHEMA)
+    upgrade_games(conn)
+    return conn
+
+
+def upgrade_games(conn: sqlite3.Connection) -> None:
+    """
+    Add and fill `games.name_key` on databases created before it existed
+    (unique on `lower(game_name)`), then index it. Rows whose names only
+    differed beyond ASCII case collapse into the most recently inserted one,
+    and game_stats is emptied so `backfill_totals` rebuilds it without them.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(games)")}
+        if "name_key" not in columns:
+            conn.execute("ALTER TABLE games ADD COLUMN name_key TEXT NOT NULL DEFAULT ''")
+            seen: Dict[Tuple[int, str], int] = {}
+            stale: List[int] = []
+            rows = conn.execute("SELECT rowid, user_id, game_name FROM games ORDER BY rowid DESC").fetchall()
+            for rowid, user_id, game_name in rows:
+                key = (user_id, name_key(game_name))
+                if key in seen:
+                    stale.append(rowid)
+                else:
+                    seen[key] = rowid
+            conn.executemany("UPDATE games SET name_key = ? WHERE rowid = ?", ((key[1], rowid) for key, rowid in seen.items()))
+            if stale:
+                logger.warning("Dropping %s game row(s) that duplicate another name of the same user", len(stale))
+                conn.executemany("DELETE FROM games WHERE rowid = ?", ((rowid,) for rowid in stale))
+                conn.execute("DELETE FROM game_stats")
+            conn.execute("DROP INDEX IF EXISTS games_user_name")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS games_user_key ON games (user_id, name_key)")
+
+
+def backfill_totals(conn: sqlite3.Connection) -> None:
+    """Build the aggregate tables from games/command_stats if they are still empty or incomplete (older databases)."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM usage_totals WHERE scope = ? LIMIT 1", (GLOBAL,)).fetchone():
+            rows = conn.execute("SELECT user_id, command, count FROM command_stats").fetchall()
+            deltas: Dict[int, Dict[str, int]] = {}
+            for user_id, command, count in rows:
+                deltas.setdefault(user_id, {})[command] = count
+            conn.executemany(USAGE_UPSERT, usage_rows(deltas))
+        missing = not conn.execute("SELECT 1 FROM game_stats LIMIT 1").fetchone() or not conn.execute(
+            "SELECT 1 FROM game_ratings LIMIT 1"
+        ).fetchone()
+        if missing and conn.execute("SELECT 1 FROM games LIMIT 1").fetchone():
+            # Rebuilt together (databases from before game_ratings counted every
+            # alias of a game as a separate rating). No per-row change times in
+            # `games`: the latest insert of a user's aliases wins, and existing
+            # update times are kept, with creation time as the fallback.
+            times = dict(conn.execute("SELECT game_key, updated_at FROM game_stats").fetchall())
+            conn.execute("DELETE FROM game_stats")
+            conn.execute("DELETE FROM game_ratings")
+            ratings: Dict[Tuple[int, str], int] = {}
+            stats: Dict[str, List[Any]] = {}
+            for user_id, game_name, rating, created_at in conn.execute(
+                "SELECT user_id, game_name, rating, created_at FROM games ORDER BY rowid"
+            ):
+                key = game_key(game_name)
+                ratings[user_id, key] = rating
+                entry = stats.setdefault(key, [game_name, 0, 0, *[0] * 11, times.get(key, 0)])
+                entry[14] = max(entry[14], created_at)
+            for (_, key), rating in ratings.items():
+                entry = stats[key]
+                entry[1] += 1
+                entry[2] += rating
+                entry[3 + rating] += 1
+            conn.executemany(
+                "INSERT INTO game_ratings (user_id, game_key, rating) VALUES (?, ?, ?)",
+                ((user_id, key, rating) for (user_id, key), rating in ratings.items()),
+            )
+            conn.executemany(
+                f"INSERT INTO game_stats (game_key, game_name, ratings, rating_sum, {HISTOGRAM}, updated_at) "
+                f"VALUES ({', '.join('?' * 16)})",
+                ((key, *entry) for key, entry in stats.items()),
+            )
+
+
+class SqliteStore:
+    """
+    SQLite-backed store with the same async API as `JsonStore`.
+
+    Every query runs on a single dedicated worker thread, so the connection is
+    only ever touched from one thread and the event loop never blocks on disk.
+    If `migrate_from` points to an existing JSON store and the database does not
+    exist yet, `start()` migrates it first.
+    """
+
+    def __init__(self, path: Path, *, migrate_from: Optional[Path] = None):
+        self.path = path
+        self.migrate_from = migrate_from
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Only touched from the executor thread.
+        self._rng = random.Random()
+        self._bags = ShuffleBags()
+        self._search: "OrderedDict[int, Tuple[float, NameSearch]]" = OrderedDict()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _open(self) -> None:
+        if self._conn is None and not self.path.exists() and self.migrate_from and has_json_state(self.migrate_from):
+            from .migrate import migrate_json_to_sqlite
+
+            games, stats = migrate_json_to_sqlite(self.migrate_from, self.path)
+            logger.info("Migrated %s game(s) and %s stat row(s) from %s", games, stats, self.migrate_from)
+        backfill_totals(self._db())
+
+    async def start(self) -> None:
+        """Open the database (and create the schema) on the worker thread."""
+        await self._run(self._open)
+
+    async def flush(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await self._run(_close)
+        self._executor.shutdown(wait=True)
+
+    def _upsert_games(self, user_id: int, games: List[Tuple[str, int]]) -> Tuple[int, int]:
+        db = self._db()
+        added = 0
+        now = int(time.time())
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            for game_name, rating in games:
+                key = name_key(game_name)
+                exists = db.execute("SELECT 1 FROM games WHERE user_id = ? AND name_key = ?", (user_id, key)).fetchone()
+                db.execute(
+                    "INSERT INTO games (user_id, game_name, name_key, rating, created_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, name_key) DO UPDATE SET rating = excluded.rating",
+                    (user_id, game_name, key, rating, now),
+                )
+                self._rate_game(db, user_id, game_name, rating, now)
+                added += exists is None
+        cached = self._search.get(user_id)
+        if cached is not None:
+            for game_name, _ in games:
+                cached[1].add(name_key(game_name), game_name, game_name)
+        return added, len(games) - added
+
+    @staticmethod
+    def _rate_game(db: sqlite3.Connection, user_id: int, game_name: str, new: int, at: int) -> None:
+        """Apply one user's rating to `game_stats` (same semantics as `Leaderboards.rate_game`)."""
+        new_col = _bucket(new)
+        key = game_key(game_name)
+        row = db.execute("SELECT rating FROM game_ratings WHERE user_id = ? AND game_key = ?", (user_id, key)).fetchone()
+        old = row[0] if row else None
+        db.execute(
+            "INSERT INTO game_ratings (user_id, game_key, rating) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, game_key) DO UPDATE SET rating = excluded.rating",
+            (user_id, key, new),
+        )
+        if old is None:
+            db.execute(
+                f"INSERT INTO game_stats (game_key, game_name, ratings, rating_sum, {new_col}, updated_at) "
+                "VALUES (?, ?, 1, ?, 1, ?) "
+                f"ON CONFLICT (game_key) DO UPDATE SET ratings = ratings + 1, rating_sum = rating_sum + excluded.rating_sum, "
+                f"{new_col} = {new_col} + 1, updated_at = max(updated_at, excluded.updated_at)",
+                (key, game_name, new, at),
+            )
+        elif old == new:
+            db.execute("UPDATE game_stats SET updated_at = max(updated_at, ?) WHERE game_key = ?", (at, key))
+        else:
+            old_col = _bucket(old)
+            db.execute(
+                f"UPDATE game_stats SET rating_sum = rating_sum + ?, {old_col} = {old_col} - 1, "
+                f"{new_col} = {new_col} + 1, updated_at = max(updated_at, ?) WHERE game_key = ?",
+                (new - old, at, key),
+            )
+
+    async def add_or_update_game(self, user_id: int, game_name: str, rating: int) -> None:
+        await self._run(self._upsert_games, user_id, [(game_name, rating)])
+
+    async def add_or_update_games(self, user_id: int, games: List[Tuple[str, int]]) -> Tuple[int, int]:
+        """Upsert many (name, rating) pairs for one user in one transaction. Returns (added, updated)."""
+        return await self._run(self._upsert_games, user_id, games)
+
+    def _list_games(self, user_id: int, comparator: Optional[str], threshold: Optional[int]) -> List[Dict[str, Any]]:
+        clause, params = _rating_clause(comparator, threshold)
+        rows = self._db().execute(
+            "SELECT user_id, game_name, rating, created_at FROM games "
+            f"WHERE user_id = ?{clause} ORDER BY rating DESC, game_name DESC",
+            (user_id, *params),
+        )
+        return [dict(row) for row in rows]
+
+    async def list_games(self, user_id: int, comparator: Optional[str] = None, threshold: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._run(self._list_games, user_id, comparator, threshold)
+
+    def _list_games_page(
+        self, user_id: int, comparator: Optional[str], threshold: Optional[int], offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        clause, params = _rating_clause(comparator, threshold)
+        db = self._db()
+        (total,) = db.execute(f"SELECT COUNT(*) FROM games WHERE user_id = ?{clause}", (user_id, *params)).fetchone()
+        rows = db.execute(
+            "SELECT user_id, game_name, rating, created_at FROM games "
+            f"WHERE user_id = ?{clause} ORDER BY rating DESC, game_name DESC LIMIT ? OFFSET ?",
+            (user_id, *params, limit, offset),
+        )
+        return [dict(row) for row in rows], total
+
+    async def list_games_page(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of `list_games` (same order) and the total number of matches."""
+        return await self._run(self._list_games_page, user_id, comparator, threshold, offset, limit)
+
+    def _name_search(self, user_id: int) -> NameSearch:
+        cached = self._search.get(user_id)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < SEARCH_TTL:
+            self._search.move_to_end(user_id)
+            return cached[1]
+        search = NameSearch()
+        for (game_name,) in self._db().execute("SELECT game_name FROM games WHERE user_id = ?", (user_id,)):
+            search.add(name_key(game_name), game_name, game_name)
+        self._search[user_id] = (now, search)
+        self._search.move_to_end(user_id)
+        while len(self._search) > SEARCH_USERS:
+            self._search.popitem(last=False)
+        return search
+
+    def _find_games(self, user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+        names = [name for _, name in self._name_search(user_id).search(query, limit)]
+        if not names:
+            return []
+        marks = ", ".join("?" for _ in names)
+        rows = self._db().execute(
+            "SELECT user_id, game_name, rating, created_at FROM games "
+            f"WHERE user_id = ? AND name_key IN ({marks})",
+            (user_id, *map(name_key, names)),
+        )
+        by_key = {name_key(row["game_name"]): dict(row) for row in rows}
+        return [by_key[key] for key in map(name_key, names) if key in by_key]
+
+    async def find_games(self, user_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The user's games whose names best match `query`, best match first."""
+        return await self._run(self._find_games, user_id, query, limit)
+
+    def _random_game(
+        self, user_id: int, comparator: Optional[str], threshold: Optional[int], mode: str
+    ) -> Optional[Dict[str, Any]]:
+        clause, params = _rating_clause(comparator, threshold)
+        db = self._db()
+        columns = "SELECT user_id, game_name, rating, created_at FROM games"
+        if mode == "bag":
+
+            def refill() -> List[str]:
+                rows = db.execute(f"SELECT name_key FROM games WHERE user_id = ?{clause}", (user_id, *params))
+                return [key for (key,) in rows]
+
+            def resolve(key: str) -> Optional[Dict[str, Any]]:
+                row = db.execute(
+                    f"{columns} WHERE user_id = ? AND name_key = ?{clause}", (user_id, key, *params)
+                ).fetchone()
+                return dict(row) if row else None
+
+            return self._bags.draw((user_id, comparator, threshold), refill, resolve)
+        # Pick a rating bucket from the per-rating counts, then an offset inside
+        # it; both queries walk the (user_id, rating) index only.
+        buckets = db.execute(
+            f"SELECT rating, COUNT(*) FROM games WHERE user_id = ?{clause} GROUP BY rating", (user_id, *params)
+        ).fetchall()
+        if not buckets:
+            return None
+        rating, size = pick_weighted(
+            [((r, n), rating_weight(r, n, mode == "weighted")) for r, n in buckets], self._rng
+        )
+        row = db.execute(
+            f"{columns} WHERE user_id = ? AND rating = ? LIMIT 1 OFFSET ?",
+            (user_id, rating, self._rng.randrange(size)),
+        ).fetchone()
+        return dict(row) if row else None
+
+    async def random_game(
+        self,
+        user_id: int,
+        comparator: Optional[str] = None,
+        threshold: Optional[int] = None,
+        *,
+        mode: str = "uniform",
+    ) -> Optional[Dict[str, Any]]:
+        """Same modes as `JsonStore.random_game`; bag state lives in this process."""
+        return await self._run(self._random_game, user_id, comparator, threshold, mode)
+
+    def _merge_stats(self, deltas: Dict[int, Dict[str, int]], guilds: Optional[GuildDeltas]) -> None:
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT INTO command_stats (user_id, command, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, command) DO UPDATE SET count = count + excluded.count",
+                (
+                    (user_id, command, count)
+                    for user_id, per_user in deltas.items()
+                    for command, count in per_user.items()
+                ),
+            )
+            db.executemany(USAGE_UPSERT, usage_rows(deltas, guilds))
+
+    async def increment_stat(self, user_id: int, command: str, guild_id: Optional[int] = None) -> None:
+        await self.merge_stats({user_id: {command: 1}}, guilds={guild_id: {user_id: {command: 1}}} if guild_id else None)
+
+    async def merge_stats(self, deltas: Dict[int, Dict[str, int]], *, guilds: Optional[GuildDeltas] = None) -> None:
+        """Add per-user (and optionally per-guild) command counters in one transaction."""
+        await self._run(self._merge_stats, deltas, guilds)
+
+    def _get_stats(self, user_id: int) -> Dict[str, int]:
+        rows = self._db().execute("SELECT command, count FROM command_stats WHERE user_id = ?", (user_id,))
+        return {command: count for command, count in rows}
+
+    async def get_stats(self, user_id: int) -> Dict[str, int]:
+        return await self._run(self._get_stats, user_id)
+
+    def _top_usage(self, scope: int, kind: str, limit: int) -> List[Tuple[str, int]]:
+        rows = self._db().execute(
+            "SELECT key, count FROM usage_totals WHERE scope = ? AND kind = ? ORDER BY count DESC LIMIT ?",
+            (scope, kind, limit),
+        )
+        return [(key, count) for key, count in rows]
+
+    async def top_commands(self, guild_id: Optional[int] = None, limit: int = 10) -> List[Tuple[str, int]]:
+        return await self._run(self._top_usage, guild_id or GLOBAL, "c", limit)
+
+    async def top_users(self, guild_id: Optional[int] = None, limit: int = 10) -> List[Tuple[int, int]]:
+        rows = await self._run(self._top_usage, guild_id or GLOBAL, "u", limit)
+        return [(int(key), count) for key, count in rows]
+
+    def _top_games(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._db().execute(
+            "SELECT game_name, CAST(rating_sum AS REAL) / ratings AS average, ratings FROM game_stats "
+            "ORDER BY CAST(rating_sum AS REAL) / ratings DESC, ratings DESC LIMIT ?",
+            (limit,),
+        )
+        return [dict(row) for row in rows]
+
+    async def top_games(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best average rating across users (ties: more ratings first)."""
+        return await self._run(self._top_games, limit)
+
+    def _game_info(self, game_name: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute(
+            f"SELECT game_name, ratings, rating_sum, {HISTOGRAM}, updated_at FROM game_stats WHERE game_key = ?",
+            (game_key(game_name),),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "game_name": row["game_name"],
+            "ratings": row["ratings"],
+            "average": row["rating_sum"] / row["ratings"],
+            "histogram": [row[f"r{i}"] for i in range(11)],
+            "updated_at": row["updated_at"],
+        }
+
+    async def game_info(self, game_name: str) -> Optional[Dict[str, Any]]:
+        """Same as `JsonStore.game_info`: one primary-key lookup."""
+        return await self._run(self._game_info, game_name)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The bot runs from `bot/` and imports its modules top-level (`storage`, `config`, ...).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from storage import create_store
+
+
+def run(backend, data_dir, steps):
+    async def main():
+        store = create_store(backend, data_dir)
+        await store.start()
+        try:
+            return await steps(store)
+        finally:
+            await store.close()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_aliases_of_one_game_count_once_per_user(backend, tmp_path):
+    async def steps(store):
+        await store.add_or_update_game(1, "Pokémon", 10)
+        await store.add_or_update_game(1, "Pokemon", 2)
+        return await store.game_info("pokemon")
+
+    info = run(backend, tmp_path, steps)
+    assert info["ratings"] == 1
+    assert info["average"] == 2.0
+    assert sum(info["histogram"]) == 1
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_rerating_an_alias_replaces_the_users_rating(backend, tmp_path):
+    async def steps(store):
+        await store.add_or_update_game(1, "Pokémon", 10)
+        await store.add_or_update_game(1, "Pokemon", 2)
+        await store.add_or_update_game(2, "POKEMON", 6)
+        await store.add_or_update_game(1, "Pokémon", 4)
+        return await store.game_info("Pokémon"), await store.top_games()
+
+    info, top = run(backend, tmp_path, steps)
+    assert (info["ratings"], info["average"]) == (2, 5.0)
+    assert top == [{"game_name": "Pokémon", "average": 5.0, "ratings": 2}]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_aggregates_survive_a_restart(backend, tmp_path):
+    async def write(store):
+        await store.add_or_update_games(1, [("Pokémon", 10), ("Celeste", 9)])
+        await store.add_or_update_game(1, "Pokemon", 2)
+        await store.add_or_update_game(2, "Celeste", 7)
+
+    async def read(store):
+        return await store.game_info("pokemon"), await store.game_info("celeste")
+
+    run(backend, tmp_path, write)
+    pokemon, celeste = run(backend, tmp_path, read)
+    assert (pokemon["ratings"], pokemon["average"]) == (1, 2.0)
+    assert (celeste["ratings"], celeste["average"]) == (2, 8.0)
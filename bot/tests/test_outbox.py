@@ -0,0 +1,193 @@
+import asyncio
+import json
+
+import discord
+import pytest
+from aiohttp import web
+
+from metrics import Metrics
+from outbox import Outbox
+
+
+def counter(metrics, name):
+    return metrics.counters.get((name, ()), 0)
+
+
+class Gate:
+    """A job that records its label and, if blocking, waits until released."""
+
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.log = []
+
+    def job(self, label, *, block=False):
+        async def run():
+            self.log.append(label)
+            if block:
+                await self.released.wait()
+            return label
+
+        return run
+
+
+def test_replies_go_before_queued_edits():
+    async def main():
+        outbox, gate = Outbox(metrics=Metrics()), Gate()
+        first = outbox.send(1, gate.job("reply-1", block=True))
+        await asyncio.sleep(0)
+        edit = outbox.edit(1, 10, gate.job("edit"))
+        second = outbox.send(1, gate.job("reply-2"))
+        gate.released.set()
+        await asyncio.gather(first, edit, second)
+        assert outbox.pending == 0
+        return gate.log
+
+    assert asyncio.run(main()) == ["reply-1", "reply-2", "edit"]
+
+
+def test_newer_edit_of_a_queued_message_replaces_it():
+    async def main():
+        metrics = Metrics()
+        outbox, gate = Outbox(metrics=metrics), Gate()
+        blocker = outbox.send(1, gate.job("reply", block=True))
+        await asyncio.sleep(0)
+        old = outbox.edit(1, 10, gate.job("frame-1"))
+        new = outbox.edit(1, 10, gate.job("frame-2"))
+        other = outbox.edit(1, 11, gate.job("other"))
+        gate.released.set()
+        results = await asyncio.gather(blocker, old, new, other)
+        return gate.log, results, old is new, counter(metrics, "oficys_outbox_coalesced_total")
+
+    log, results, same, coalesced = asyncio.run(main())
+    assert log == ["reply", "frame-2", "other"]
+    assert results == ["reply", "frame-2", "frame-2", "other"]
+    assert same and coalesced == 1
+
+
+def test_edits_beyond_max_pending_are_dropped_but_replies_are_not():
+    async def main():
+        metrics = Metrics()
+        outbox, gate = Outbox(max_pending=2, metrics=metrics), Gate()
+        blocker = outbox.send(1, gate.job("reply", block=True))
+        await asyncio.sleep(0)
+        kept = [outbox.edit(1, 10, gate.job("edit-10")), outbox.edit(1, 11, gate.job("edit-11"))]
+        dropped = outbox.edit(1, 12, gate.job("edit-12"))
+        late_reply = outbox.send(1, gate.job("late-reply"))
+        assert dropped.cancelled()
+        gate.released.set()
+        await asyncio.gather(blocker, late_reply, *kept)
+        return gate.log, counter(metrics, "oficys_outbox_dropped_total")
+
+    log, dropped = asyncio.run(main())
+    assert log == ["reply", "late-reply", "edit-10", "edit-11"]
+    assert dropped == 1
+
+
+def test_close_drains_queued_jobs():
+    async def main():
+        outbox, gate = Outbox(metrics=Metrics()), Gate()
+        futures = [outbox.send(channel, gate.job(f"reply-{channel}")) for channel in (1, 2)]
+        futures.append(outbox.edit(1, 10, gate.job("edit")))
+        await outbox.close(timeout=1)
+        after = outbox.send(1, gate.job("after-close"))
+        return gate.log, [f.result() for f in futures], after
+
+    log, results, after = asyncio.run(main())
+    assert sorted(log) == ["edit", "reply-1", "reply-2"]
+    assert results == ["reply-1", "reply-2", "edit"]
+    with pytest.raises(RuntimeError):
+        after.result()
+
+
+def test_close_cancels_what_does_not_finish_in_time():
+    async def main():
+        outbox, gate = Outbox(metrics=Metrics()), Gate()
+        stuck = outbox.send(1, gate.job("stuck", block=True))
+        queued = outbox.edit(1, 10, gate.job("never"))
+        await outbox.close(timeout=0.05)
+        return gate.log, stuck.cancelled(), queued.cancelled(), outbox.pending
+
+    assert asyncio.run(main()) == (["stuck"], True, True, 0)
+
+
+def json_response(payload, *, status=200, headers=None):
+    # discord.py only decodes bodies whose content type is exactly `application/json`.
+    return web.Response(
+        body=json.dumps(payload).encode(), status=status, headers={"Content-Type": "application/json", **(headers or {})}
+    )
+
+
+class FakeDiscord:
+    """Just enough of the Discord REST API for message sends and edits, with one 429 up front."""
+
+    def __init__(self):
+        self.requests = []
+        self.rate_limit_next = True
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.me)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self.message)
+        app.router.add_patch("/api/v10/channels/{channel_id}/messages/{message_id}", self.message)
+        self.runner = web.AppRunner(app)
+
+    async def start(self):
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        return self.runner.addresses[0][1]
+
+    async def me(self, request):
+        return json_response({"id": "1", "username": "oficys", "discriminator": "0", "avatar": None})
+
+    async def message(self, request):
+        if self.rate_limit_next:
+            self.rate_limit_next = False
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": 0.05, "global": False},
+                status=429,
+                headers={"Retry-After": "0.05", "X-RateLimit-Scope": "user", "Via": "1.1 google"},
+            )
+        body = await request.json()
+        self.requests.append((request.method, request.match_info.get("message_id"), body.get("content")))
+        message_id = request.match_info.get("message_id", "500")
+        return json_response({"id": message_id, "channel_id": request.match_info["channel_id"], "content": body.get("content")})
+
+
+def test_delivery_through_discord_http_against_a_mock_api(monkeypatch):
+    async def main():
+        server = FakeDiscord()
+        port = await server.start()
+        monkeypatch.setattr(discord.http.Route, "BASE", f"http://127.0.0.1:{port}/api/v10")
+        http = discord.http.HTTPClient(asyncio.get_running_loop())
+        await http.static_login("token")
+        outbox = Outbox(metrics=Metrics())
+
+        def send(content):
+            async def run():
+                with discord.http.handle_message_parameters(content=content) as params:
+                    return await http.send_message(42, params=params)
+
+            return run
+
+        def edit(message_id, content):
+            async def run():
+                with discord.http.handle_message_parameters(content=content) as params:
+                    return await http.edit_message(42, message_id, params=params)
+
+            return run
+
+        try:
+            reply = outbox.send(42, send("oi"))
+            await asyncio.sleep(0)
+            outbox.edit(42, 500, edit(500, "frame-1"))
+            frame = outbox.edit(42, 500, edit(500, "frame-2"))
+            results = await asyncio.gather(reply, frame)
+            await outbox.close()
+        finally:
+            await http.close()
+            await server.runner.cleanup()
+        return server.requests, results, server.rate_limit_next
+
+    requests, (reply, frame), rate_limit_pending = asyncio.run(main())
+    # The first send hit a 429, was retried by discord.py, and the stale frame never went out.
+    assert not rate_limit_pending
+    assert requests == [("POST", None, "oi"), ("PATCH", "500", "frame-2")]
+    assert reply["content"] == "oi" and frame["content"] == "frame-2"
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+from discord.ext import commands
+
+import bot as bot_module
+
+
+def fake_message(content, shard_id, *, author_bot=False):
+    guild = SimpleNamespace(id=100 + shard_id, shard_id=shard_id)
+    return SimpleNamespace(content=content, guild=guild, author=SimpleNamespace(id=7, bot=author_bot))
+
+
+def make_sharded_bot(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot_module, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(bot_module, "SHARDED", True)
+    monkeypatch.setattr(bot_module, "get_shard_config", lambda: (2, [0, 1]))
+    return bot_module.create_bot()
+
+
+def test_create_bot_builds_the_sharded_variant(monkeypatch, tmp_path):
+    bot = make_sharded_bot(monkeypatch, tmp_path)
+    assert isinstance(bot, bot_module.ShardedOficysBot)
+    assert isinstance(bot, commands.AutoShardedBot)
+    mro = type(bot).__mro__
+    # OficysBot's overrides (on_message, invoke, close...) must win over the library's.
+    assert mro.index(bot_module.OficysBot) < mro.index(commands.AutoShardedBot)
+    assert (bot.shard_count, bot.shard_ids) == (2, [0, 1])
+
+
+def test_shard_events_and_messages_are_counted_per_shard(monkeypatch, tmp_path):
+    bot = make_sharded_bot(monkeypatch, tmp_path)
+    processed = []
+
+    async def process_commands(message):
+        processed.append(message.content)
+
+    bot.process_commands = process_commands
+
+    async def main():
+        async with bot:
+            bot.dispatch("shard_connect", 0)
+            bot.dispatch("shard_connect", 1)
+            bot.dispatch("shard_disconnect", 1)
+            bot.dispatch("shard_resumed", 1)
+            bot.dispatch("message", fake_message("oi", 0))
+            bot.dispatch("message", fake_message("&flip a b", 1))
+            bot.dispatch("message", fake_message("&flip a b", 1, author_bot=True))
+            ctx = SimpleNamespace(
+                command=SimpleNamespace(qualified_name="flip"),
+                author=SimpleNamespace(id=7),
+                guild=SimpleNamespace(id=101, shard_id=1),
+                channel=SimpleNamespace(name="geral"),
+            )
+            await bot.on_command(ctx)
+            # Let the dispatched event tasks run.
+            for _ in range(5):
+                await asyncio.sleep(0)
+            return bot.shard_metrics.snapshot([(0, 0.05), (1, float("inf"))])
+
+    rows = asyncio.run(main())
+    assert processed == ["&flip a b"]
+    shard0, shard1 = rows
+    assert shard0["shard_id"] == 0 and shard0["latency_ms"] == 50.0
+    assert shard0["messages_total"] == 1 and shard0["connects"] == 1
+    assert shard1["latency_ms"] is None
+    assert shard1["messages_total"] == 2 and shard1["commands_total"] == 1
+    assert (shard1["connects"], shard1["disconnects"], shard1["resumes"]) == (1, 1, 1)
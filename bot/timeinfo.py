@@ -0,0 +1,91 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+
+def day_indicator(now: datetime) -> str:
+    symbols = ["S", "T", "Q", "Q", "S", "S", "D"]
+    today = now.weekday()  # Monday=0
+    parts = []
+    for idx, sym in enumerate(symbols):
+        if idx == today:
+            parts.append(f"**{sym}**")
+        else:
+            parts.append(sym)
+    return "  ".join(parts)
+
+
+@dataclass(frozen=True)
+class DayFacts:
+    weekday: str
+    indicator: str
+    day_of_year: int
+    total_days: int
+    # Local 23:59:59 of this day, used for "hours left" and cache expiry.
+    end_of_day: datetime
+
+
+@dataclass(frozen=True)
+class TimeSnapshot:
+    epoch_second: int
+    main: datetime
+    zones: Tuple[Tuple[str, datetime], ...]
+    day: DayFacts
+    hours_left: int
+
+
+class TimeInfoService:
+    """
+    Shared clock for the time commands.
+
+    Zones are resolved once. `snapshot()` computes every zone's local time at
+    most once per wall-clock second and reuses it for all callers in that
+    second; day-level facts (weekday, day of year, leap year) are kept until
+    the main zone's midnight.
+    """
+
+    def __init__(self, main_timezone: str, timezones: List[str]):
+        self.main_zone = ZoneInfo(main_timezone)
+        self.zones: List[Tuple[str, ZoneInfo]] = [(name, ZoneInfo(name)) for name in timezones]
+        self._snapshot: Optional[TimeSnapshot] = None
+        self._day: Optional[DayFacts] = None
+
+    def now(self) -> datetime:
+        return datetime.now(self.main_zone)
+
+    def _day_facts(self, main: datetime) -> DayFacts:
+        day = self._day
+        if day is not None and main <= day.end_of_day:
+            return day
+        is_leap = datetime(main.year, 12, 31).timetuple().tm_yday == 366
+        end_of_day = datetime(main.year, main.month, main.day, 23, 59, 59, tzinfo=main.tzinfo)
+        # Anything after 23:59:59 belongs to the next day.
+        end_of_day += timedelta(microseconds=999999)
+        self._day = day = DayFacts(
+            weekday=main.strftime("%A"),
+            indicator=day_indicator(main),
+            day_of_year=main.timetuple().tm_yday,
+            total_days=366 if is_leap else 365,
+            end_of_day=end_of_day,
+        )
+        return day
+
+    def snapshot(self) -> TimeSnapshot:
+        second = int(time.time())
+        cached = self._snapshot
+        if cached is not None and cached.epoch_second == second:
+            return cached
+        main = datetime.fromtimestamp(second, self.main_zone)
+        zones = tuple((name, datetime.fromtimestamp(second, tz)) for name, tz in self.zones)
+        day = self._day_facts(main)
+        seconds_left = int((day.end_of_day.replace(microsecond=0) - main).total_seconds())
+        self._snapshot = cached = TimeSnapshot(
+            epoch_second=second,
+            main=main,
+            zones=zones,
+            day=day,
+            hours_left=max(0, seconds_left // 3600),
+        )
+        return cached
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-import random
-from typing import Iterable, Optional
+import time
+import zlib
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
 
 import discord
 
+from metrics import registry
+
+_EMBED_BUILD = registry.histogram("oficys_embed_build_seconds")
+
 
 class Theme:
     PRIMARY = discord.Color.blurple()
@@ -13,9 +19,16 @@ class Theme:
     ERROR = discord.Color.red()
 
 
+_EMOJIS = ("✨", "🌟", "💫", "🎯", "🧠", "⚡", "🪄", "🎲", "🧩")
+
+# Shared, pre-built embeds keyed by name. See `template`.
+_TEMPLATES: dict[str, discord.Embed] = {}
+
+
+@lru_cache(maxsize=2048)
 def _pick_emoji(seed: str) -> str:
-    rng = random.Random(seed)
-    return rng.choice(["✨", "🌟", "💫", "🎯", "🧠", "⚡", "🪄", "🎲", "🧩"])
+    # Stable across processes (unlike hash()) and far cheaper than seeding a Random.
+    return _EMOJIS[zlib.crc32(seed.encode("utf-8")) % len(_EMOJIS)]
 
 
 def embed(
@@ -25,9 +38,11 @@ def embed(
     color: discord.Color = Theme.PRIMARY,
     footer: str | None = "Oficys • digite &help para ver tudo",
 ) -> discord.Embed:
+    started = time.perf_counter()
     e = discord.Embed(title=title, description=description, color=color)
     if footer:
         e.set_footer(text=footer)
+    _EMBED_BUILD.observe(time.perf_counter() - started)
     return e
 
 
@@ -48,6 +63,19 @@ def info(title: str, description: str | None = None, *, seed: str | None = None)
     return embed(title=f"{prefix} {title}", description=description, color=Theme.PRIMARY)
 
 
+def template(key: str, build: Callable[[], discord.Embed]) -> discord.Embed:
+    """
+    Return the embed cached under `key`, building it on first use.
+
+    The embed is shared between calls: send it as-is, or `.copy()` it before
+    changing anything.
+    """
+    cached = _TEMPLATES.get(key)
+    if cached is None:
+        cached = _TEMPLATES[key] = build()
+    return cached
+
+
 def clamp_fields(items: Iterable[tuple[str, str, bool]], limit: int = 25) -> list[tuple[str, str, bool]]:
     out: list[tuple[str, str, bool]] = []
     for idx, item in enumerate(items):
@@ -22,4 +22,11 @@ echo "  - DISCORD_LOG_LEVEL=${DISCORD_LOG_LEVEL:-WARNING}"
 echo "  - LOG_FILE=${LOG_FILE:-}"
 echo
 
+if [[ "${1:-}" == "--cluster" ]]; then
+  echo "  - CLUSTER_WORKERS=${CLUSTER_WORKERS:-$(nproc)}"
+  echo "  - SHARD_COUNT=${SHARD_COUNT:-}"
+  echo
+  exec python bot/cluster.py
+fi
+
 exec python bot/main.py